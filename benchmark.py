@@ -0,0 +1,201 @@
+"""Offline crawl benchmark against the local mock portal
+
+Runs the real crawl (browser, captcha, search, HTTP and browser downloads,
+results sink) against mock_portal.py for each table size and reports
+throughput, per-stage latency percentiles and peak memory.
+
+    python benchmark.py --sizes 100 1000 10000 --json benchmark.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+from mock_portal import MockPortal
+
+import new
+import metrics
+from waits import reset_wait_stats, wait_samples, percentile
+from results_sink import open_results_sink
+from job_state import open_job_state
+
+CAPTCHA_ANSWER = "123456"
+FROM_DATE = "01/02/2025"
+TO_DATE = "28/02/2025"
+RSS_SAMPLE_INTERVAL = 0.5  # seconds
+
+
+def benchmark_config(workdir, portal_url, rows, args):
+    return {
+        "downloaded_pdf_number": 0,
+        "bench": "Principal Bench",
+        "website_url": portal_url,
+        "download_directory": os.path.join(workdir, "pdfs"),
+        "excel_path": os.path.join(workdir, "records.xlsx"),
+        "date_config": {"from_date": FROM_DATE, "to_date": TO_DATE},
+        "pdf_range": {"start_serial": 1, "end_serial": rows},
+        "results_sink": {"type": args.sink, "batch_size": 50, "flush_interval": 30},
+        "http_download": {"enabled": not args.browser_only, "max_workers": 4, "retries": 3, "timeout": 60},
+        "workers": 1,
+        "captcha": {"solvers": ["fixed"], "fixed_answer": CAPTCHA_ANSWER, "max_attempts": 3},
+        "retry": {"max_attempts": 1, "backoff": 0, "max_delay": 0},
+        "pipeline": {"enabled": True, "max_in_flight": 1, "queue_size": 8},
+        "browser": {"headless": not args.headed, "recycle_after_rows": args.recycle_after_rows},
+    }
+
+
+class RssSampler:
+    """Samples resident memory of this process and its children (the browser) while a run is going
+
+    The browser is gone once crawl() returns, so the peak has to be caught
+    during the run. peak_mb is None without psutil.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        try:
+            import psutil
+        except ImportError:
+            self.psutil = None
+            return
+        self.psutil = psutil
+        self.thread = threading.Thread(target=self.run, name="rss-sampler", daemon=True)
+        self.thread.start()
+
+    def sample(self):
+        process = self.psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except self.psutil.Error:
+                pass
+        self.peak = max(self.peak, total)
+
+    def run(self):
+        while True:
+            self.sample()
+            if self.stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        """Stop sampling; returns the peak in MB"""
+        if self.psutil is None:
+            return None
+        self.stopped.set()
+        self.thread.join()
+        return round(self.peak / 1024 / 1024, 1)
+
+
+def stage_latencies():
+    """p50/p95/max seconds for every wait recorded during the run"""
+    return {
+        name: {
+            "n": len(samples),
+            "p50": round(percentile(samples, 0.50), 3),
+            "p95": round(percentile(samples, 0.95), 3),
+            "max": round(max(samples), 3),
+        }
+        for name, samples in sorted(wait_samples().items()) if samples
+    }
+
+
+def run_once(rows, args):
+    workdir = tempfile.mkdtemp(prefix=f"khc-bench-{rows}-")
+    portal = MockPortal(rows=rows, from_date=FROM_DATE, to_date=TO_DATE, captcha=CAPTCHA_ANSWER,
+                        search_latency=args.search_latency, pdf_latency=args.pdf_latency,
+                        pdf_size=args.pdf_size, missing_every=args.missing_every).start()
+    config = benchmark_config(workdir, portal.url, rows, args)
+    os.makedirs(config["download_directory"], exist_ok=True)
+
+    # Stats files are relative paths; keep the benchmark's out of the real ones
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    reset_wait_stats()
+    metrics.start_run({"metrics": {"enabled": False}})
+    new._captcha_solvers = None
+    jobs = open_job_state(config)
+    sink = open_results_sink(config, on_flush=jobs.mark_rows)
+    serials = list(range(1, rows + 1))
+    jobs.seed(serials)
+
+    tracemalloc.start()
+    sampler = RssSampler()
+    start = time.monotonic()
+    try:
+        new.crawl(config, serials, sink, jobs)
+        sink.close()
+    finally:
+        elapsed = time.monotonic() - start
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss = sampler.stop()
+        counts = jobs.counts()
+        jobs.close()
+        portal.stop()
+        os.chdir(cwd)
+
+    result = {
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_minute": round(rows / elapsed * 60, 1) if elapsed else None,
+        "job_counts": counts,
+        "portal": dict(portal.stats),
+        "python_peak_mb": round(python_peak / 1024 / 1024, 1),
+        "process_rss_mb": rss,
+        "stages": stage_latencies(),
+        "metrics": metrics.snapshot(),
+    }
+    if args.keep:
+        result["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def print_result(result):
+    print(f"\n=== {result['rows']} rows ===")
+    print(f"  {result['seconds']}s, {result['rows_per_minute']} rows/min, jobs {result['job_counts']}")
+    print(f"  portal: {result['portal']}")
+    print(f"  memory: python peak {result['python_peak_mb']} MB, "
+          f"rss {result['process_rss_mb'] if result['process_rss_mb'] is not None else 'n/a'} MB")
+    for name, entry in result["stages"].items():
+        print(f"  {name:16} n={entry['n']:<5} p50={entry['p50']:.3f}s p95={entry['p95']:.3f}s max={entry['max']:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crawler against the local mock portal")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="rows per run")
+    parser.add_argument("--search-latency", type=float, default=0.5)
+    parser.add_argument("--pdf-latency", type=float, default=0.05)
+    parser.add_argument("--pdf-size", type=int, default=200_000)
+    parser.add_argument("--missing-every", type=int, default=20)
+    parser.add_argument("--sink", default="excel", help="results sink type")
+    parser.add_argument("--headed", action="store_true", help="show the browser window")
+    parser.add_argument("--recycle-after-rows", type=int, default=0, help="restart the browser every N rows")
+    parser.add_argument("--browser-only", action="store_true", help="disable the HTTP download path")
+    parser.add_argument("--keep", action="store_true", help="keep each run's temporary directory")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.sizes:
+        result = run_once(rows, args)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import io
+import os
+import json
+import time
+import base64
+import threading
+
+CAPTCHA_LENGTH = 6
+SAMPLES_DIR = "captcha_samples"   # accepted captchas, saved as <digits>_<timestamp>.png
+STATS_FILE = "captcha_stats.json"
+GLYPH_SIZE = (16, 24)
+MAX_GLYPH_DISTANCE = 0.25         # fraction of differing pixels we still trust
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def is_valid_captcha(text):
+    return bool(text) and text.isdigit() and len(text) == CAPTCHA_LENGTH
+
+
+class CaptchaSolver:
+    """Turns a captcha image (PNG bytes) into its digits, or None if unsure"""
+    name = "solver"
+
+    def solve(self, image_png):
+        raise NotImplementedError
+
+
+class LocalCaptchaSolver(CaptchaSolver):
+    """Offline template matcher built from previously accepted captchas"""
+    name = "local"
+
+    def __init__(self, samples_dir=SAMPLES_DIR):
+        self.samples_dir = samples_dir
+        self.templates = []  # (digit, glyph bits)
+        try:
+            from PIL import Image  # noqa: F401
+            self.available = True
+        except ImportError:
+            print("Pillow is not installed, local captcha solver disabled")
+            self.available = False
+            return
+        self.load_templates()
+
+    def load_templates(self):
+        if not os.path.isdir(self.samples_dir):
+            return
+        for filename in sorted(os.listdir(self.samples_dir)):
+            label = filename.split('_', 1)[0]
+            if not is_valid_captcha(label):
+                continue
+            with open(os.path.join(self.samples_dir, filename), 'rb') as f:
+                glyphs = self.segment(f.read())
+            if len(glyphs) == CAPTCHA_LENGTH:
+                self.templates.extend(zip(label, glyphs))
+        print(f"Local captcha solver loaded {len(self.templates)} digit templates")
+
+    def add_sample(self, image_png, text):
+        """Keep an accepted captcha so later runs can recognise its digits"""
+        if not self.available:
+            return
+        os.makedirs(self.samples_dir, exist_ok=True)
+        path = os.path.join(self.samples_dir, f"{text}_{int(time.time() * 1000)}.png")
+        with open(path, 'wb') as f:
+            f.write(image_png)
+        glyphs = self.segment(image_png)
+        if len(glyphs) == CAPTCHA_LENGTH:
+            self.templates.extend(zip(text, glyphs))
+
+    def segment(self, image_png):
+        """Split the captcha into CAPTCHA_LENGTH normalised glyph bitmaps"""
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(image_png)).convert('L')
+        width, height = image.size
+        pixels = list(image.getdata())
+        threshold = sum(pixels) / len(pixels) * 0.75  # digits are darker than the background
+        dark = [[pixels[y * width + x] < threshold for x in range(width)] for y in range(height)]
+
+        # Runs of columns that contain ink are the digits
+        columns = [any(dark[y][x] for y in range(height)) for x in range(width)]
+        runs = []
+        start = None
+        for x, inked in enumerate(columns + [False]):
+            if inked and start is None:
+                start = x
+            elif not inked and start is not None:
+                runs.append((start, x))
+                start = None
+        if len(runs) != CAPTCHA_LENGTH and runs:
+            # Touching or broken digits: fall back to equal slices of the inked area
+            left, right = runs[0][0], runs[-1][1]
+            step = (right - left) / CAPTCHA_LENGTH
+            runs = [(int(left + k * step), int(left + (k + 1) * step)) for k in range(CAPTCHA_LENGTH)]
+
+        glyphs = []
+        for left, right in runs:
+            rows = [y for y in range(height) if any(dark[y][x] for x in range(left, right))]
+            if not rows:
+                return []
+            glyph = Image.new('L', (right - left, rows[-1] - rows[0] + 1))
+            glyph.putdata([0 if dark[y][x] else 255
+                           for y in range(rows[0], rows[-1] + 1) for x in range(left, right)])
+            glyph = glyph.resize(GLYPH_SIZE)
+            glyphs.append(tuple(value < 128 for value in glyph.getdata()))
+        return glyphs
+
+    def solve(self, image_png):
+        if not self.available or not self.templates:
+            return None
+        glyphs = self.segment(image_png)
+        if len(glyphs) != CAPTCHA_LENGTH:
+            return None
+
+        size = GLYPH_SIZE[0] * GLYPH_SIZE[1]
+        digits = []
+        for glyph in glyphs:
+            distance, digit = min(
+                (sum(a != b for a, b in zip(glyph, template)), label)
+                for label, template in self.templates
+            )
+            if distance / size > MAX_GLYPH_DISTANCE:
+                return None
+            digits.append(digit)
+        return ''.join(digits)
+
+
+class FixedCaptchaSolver(CaptchaSolver):
+    """Always answers the same digits; for the mock portal, which accepts a fixed captcha"""
+    name = "fixed"
+
+    def __init__(self, answer):
+        self.answer = answer
+
+    def solve(self, image_png):
+        return self.answer
+
+
+class GeminiCaptchaSolver(CaptchaSolver):
+    name = "gemini"
+
+    def __init__(self, model):
+        self.model = model
+
+    def solve(self, image_png):
+        image_data = {
+            "mime_type": "image/png",
+            "data": base64.b64encode(image_png).decode('utf-8')
+        }
+        message_parts = [
+            "This is a captcha image containing exactly 6 digits. Return only these 6 digits, nothing else.",
+            image_data
+        ]
+        print("Sending captcha to Gemini...")
+        response = self.model.generate_content(message_parts)
+        captcha_text = response.text.strip()
+        print(f"Gemini identified captcha: {captcha_text}")
+        return captcha_text
+
+
+def load_stats():
+    global _stats
+    if os.path.exists(STATS_FILE):
+        try:
+            with open(STATS_FILE, 'r') as f:
+                _stats = json.load(f)
+        except Exception as e:
+            print(f"Could not read {STATS_FILE}: {e}")
+
+
+def save_stats():
+    with _stats_lock:
+        with open(STATS_FILE, 'w') as f:
+            json.dump(_stats, f, indent=4)
+
+
+def record_attempt(solver_name, seconds, answered=False, accepted=None):
+    """Count a solver attempt; accepted is None until the site has judged the answer"""
+    with _stats_lock:
+        entry = _stats.setdefault(solver_name, {
+            "attempts": 0, "answered": 0, "accepted": 0, "rejected": 0, "total_seconds": 0.0,
+        })
+        if accepted is None:
+            entry["attempts"] += 1
+            entry["answered"] += 1 if answered else 0
+            entry["total_seconds"] = round(entry["total_seconds"] + seconds, 3)
+        elif accepted:
+            entry["accepted"] += 1
+        else:
+            entry["rejected"] += 1
+
+
+def print_stats():
+    with _stats_lock:
+        items = sorted(_stats.items())
+    print("\nCaptcha solvers:")
+    for name, entry in items:
+        judged = entry["accepted"] + entry["rejected"]
+        accuracy = f"{entry['accepted'] / judged:.0%}" if judged else "n/a"
+        latency = entry["total_seconds"] / entry["attempts"] if entry["attempts"] else 0
+        print(f"  {name}: attempts={entry['attempts']} answered={entry['answered']} "
+              f"accuracy={accuracy} avg latency={latency:.2f}s")
+
+
+def solve_with(solvers, image_png):
+    """Ask each solver in turn; returns (solver, text) for the first valid answer"""
+    for solver in solvers:
+        start = time.monotonic()
+        try:
+            text = solver.solve(image_png)
+        except Exception as e:
+            print(f"Captcha solver {solver.name} failed: {e}")
+            text = None
+        text = text.strip() if text else None
+        valid = is_valid_captcha(text)
+        record_attempt(solver.name, time.monotonic() - start, answered=valid)
+        if valid:
+            return solver, text
+        print(f"Captcha solver {solver.name} gave no usable answer")
+    return None, None
@@ -0,0 +1,96 @@
+import os
+
+from results_sink import read_workbook_rows, read_journal_rows
+
+
+def normalize(value):
+    """Same character filter as the KAHC_ filenames, so table, Excel and filenames compare equal"""
+    text = "".join(c for c in str(value or '') if c.isalnum() or c in "._- ")
+    return " ".join(text.split()).upper()
+
+
+def case_key(case_no, year, decision_date=''):
+    return normalize(case_no), normalize(year), normalize(decision_date)
+
+
+def parse_kahc_filename(filename):
+    """(case_no, year) from KAHC_<case no>_<year>_<parties>.pdf, or None"""
+    if not filename.startswith("KAHC_") or not filename.lower().endswith(".pdf"):
+        return None
+    parts = filename[len("KAHC_"):].split("_", 2)
+    if len(parts) < 3:
+        return None
+    return normalize(parts[0]), normalize(parts[1])
+
+
+class CaseIndex:
+    """Judgments we already have, keyed by (case_no, year, decision_date)
+
+    Excel rows and the store manifest give the full key. Files on disk
+    only carry case no and year in their names, so they match on those two,
+    but only for cases with no full-key row: a case can have several
+    judgments, and one collected doesn't mean all are.
+    """
+
+    def __init__(self):
+        self.downloaded = set()
+        self.not_available = set()
+        self.on_disk = set()     # (case_no, year) from KAHC_ filenames
+        self.recorded = set()    # (case_no, year) of cases with a full-key downloaded row
+
+    def add_excel_rows(self, rows):
+        for row in rows:
+            key = case_key(row[1], row[2], row[4])
+            if row[6] == 'DOWNLOADED':
+                self.downloaded.add(key)
+                self.recorded.add(key[:2])
+            elif row[6] == 'NOT AVAILABLE':
+                self.not_available.add(key)
+
+    def add_directory(self, directory):
+        if not os.path.isdir(directory):
+            return
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                parsed = parse_kahc_filename(entry.name)
+                if parsed:
+                    self.on_disk.add(parsed)
+
+    def add_store(self, store):
+        for key in store.case_keys():
+            self.downloaded.add(tuple(key))
+            self.recorded.add(tuple(key[:2]))
+
+    def add(self, case_data):
+        """Record a row as it is written, so later windows and batches see it"""
+        key = case_key(case_data.get('case_no'), case_data.get('year'), case_data.get('decision_date'))
+        if case_data.get('pdf_status') == 'DOWNLOADED':
+            self.downloaded.add(key)
+            self.recorded.add(key[:2])
+        elif case_data.get('pdf_status') == 'NOT AVAILABLE':
+            self.not_available.add(key)
+
+    def has(self, record, include_not_available=True):
+        key = case_key(record.get('case_no'), record.get('year'), record.get('decision_date'))
+        if key in self.downloaded:
+            return True
+        if key[:2] in self.on_disk and key[:2] not in self.recorded:
+            # A file with no row to say which judgment it is
+            return True
+        return include_not_available and key in self.not_available
+
+
+def build_case_index(config, store=None):
+    """Index of collected judgments from the workbook, the download directory and the PDF store"""
+    index = CaseIndex()
+    try:
+        index.add_excel_rows(read_workbook_rows(config["excel_path"]))
+        index.add_excel_rows(read_journal_rows(config["excel_path"] + '.journal'))
+    except Exception as e:
+        print(f"Could not read {config['excel_path']} for the case index: {e}")
+    index.add_directory(config.get("main_download_directory", config["download_directory"]))
+    if store is not None:
+        index.add_store(store)
+    print(f"Case index: {len(index.downloaded)} downloaded, {len(index.not_available)} not available, "
+          f"{len(index.on_disk)} KAHC files on disk")
+    return index
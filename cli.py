@@ -0,0 +1,192 @@
+"""Command line entry point
+
+    python cli.py crawl            crawl the month in new.json
+    python cli.py resume           retry failed rows from scratch, then crawl
+    python cli.py status           progress from the job state, no browser
+    python cli.py export           rebuild the workbook from Excel, journal and files on disk
+    python cli.py verify [--hash]  check stored PDFs are complete (and match their checksum)
+
+Only the standard library is imported up front; selenium, openpyxl and
+Gemini are loaded by the commands that need them.
+"""
+import os
+import sys
+import json
+import argparse
+
+DEFAULT_CONFIG = "new.json"
+
+
+def load_config(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def run_crawl(args):
+    os.environ["KHC_CONFIG"] = args.config
+    import new
+    new.CONFIG_FILE = args.config
+    remaining = new.main(interactive=False)
+    print(f"{remaining} rows still outstanding")
+    return 0 if remaining == 0 else 3
+
+
+def cmd_crawl(args):
+    return run_crawl(args)
+
+
+def cmd_resume(args):
+    from job_state import open_job_state
+
+    jobs = open_job_state(load_config(args.config))
+    reset = jobs.reset_failed()
+    jobs.close()
+    print(f"Reset {reset} failed rows for another round of attempts")
+    return run_crawl(args)
+
+
+def cmd_status(args):
+    from job_state import open_job_state, job_state_path
+
+    config = load_config(args.config)
+    date_config = config["date_config"]
+    pdf_range = config["pdf_range"]
+    print(f"{config.get('bench', '')} {date_config['from_date']} - {date_config['to_date']}: "
+          f"serials {pdf_range['start_serial']}..{pdf_range['end_serial'] or '?'}, "
+          f"downloaded_pdf_number {config['downloaded_pdf_number']}")
+
+    if os.path.exists(job_state_path(config)):
+        jobs = open_job_state(config)
+        all_serials = range(pdf_range["start_serial"], pdf_range["end_serial"] + 1)
+        print(f"Jobs: {jobs.counts()}, {len(jobs.outstanding(all_serials))} outstanding")
+        for serial, attempts, error in jobs.failures(args.failures):
+            print(f"  {serial}: {attempts} attempts, last error: {error}")
+        jobs.close()
+    else:
+        print(f"No job state yet ({job_state_path(config)})")
+
+    queue_path = config.get("scheduler", {}).get("queue_path", "months.sqlite")
+    if os.path.exists(queue_path):
+        from scheduler import MonthQueue
+        queue = MonthQueue(queue_path)
+        print(f"Month queue: {queue.counts()}")
+        queue.close()
+
+    if config.get("pdf_store", {}).get("enabled"):
+        from pdf_store import store_root, MANIFEST_FILE
+        if os.path.exists(os.path.join(store_root(config), MANIFEST_FILE)):
+            from pdf_store import open_pdf_store
+            entries = open_pdf_store(config).entries()
+            print(f"PDF store: {len(entries)} files, {sum(size for _, _, size in entries) / 1024 / 1024:.1f} MB")
+    return 0
+
+
+def files_on_disk(config):
+    """Every KAHC_ PDF we have: flat in the download directory and in the PDF store"""
+    names = []
+    download_dir = config["download_directory"]
+    if os.path.isdir(download_dir):
+        names += [name for name in sorted(os.listdir(download_dir))
+                  if name.startswith("KAHC_") and name.lower().endswith(".pdf")]
+    if config.get("pdf_store", {}).get("enabled"):
+        from pdf_store import open_pdf_store
+        names += [os.path.basename(path) for _, path, _ in open_pdf_store(config).entries()]
+    return names
+
+
+def row_from_filename(name):
+    from case_index import parse_kahc_filename
+    from results_sink import COLUMNS
+
+    parsed = parse_kahc_filename(name)
+    if parsed is None:
+        return None
+    parties = name[len("KAHC_"):-len(".pdf")].split("_", 2)[2].replace("_VS_", " VS ")
+    case_data = {'case_no': parsed[0], 'year': parsed[1], 'case_title': parties,
+                 'pdf_status': 'DOWNLOADED', 'new_filename': name}
+    return [''] + [case_data.get(key, '') for _, key in COLUMNS[1:]]
+
+
+def cmd_export(args):
+    from results_sink import read_workbook_rows, read_journal_rows, write_workbook, merge_rows, HEADERS
+
+    config = load_config(args.config)
+    excel_path = config["excel_path"]
+    rows = [[int(row[0])] + list(row[1:])
+            for row in read_workbook_rows(excel_path) + read_journal_rows(excel_path + '.journal')
+            if row and str(row[0]).isdigit()]
+    # Journal rows are newer; serials shift between runs, so one SNo may hold several cases
+    rows = sorted(merge_rows([], rows), key=lambda row: row[0])
+    known = {row[8] for row in rows if row[8]}
+    extra = [row for row in map(row_from_filename, files_on_disk(config))
+             if row and row[8] not in known]
+    ordered = rows + extra
+
+    output = args.output or excel_path
+    if output.lower().endswith('.csv'):
+        import csv
+        with open(output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS)
+            writer.writerows(ordered)
+    else:
+        write_workbook(output, ordered)
+        journal_path = excel_path + '.journal'
+        if os.path.abspath(output) == os.path.abspath(excel_path) and os.path.exists(journal_path):
+            # Its rows are in the workbook now; left behind, the next crawl would append them again
+            os.remove(journal_path)
+    print(f"Wrote {len(ordered)} rows to {output} ({len(extra)} recovered from files on disk)")
+    return 0
+
+
+def cmd_verify(args):
+    from pdf_store import verify_pdf, sha256_of, InvalidPdf
+
+    config = load_config(args.config)
+    checked, problems = 0, []
+    # Flat files too: a month can start unsharded before the store is switched on
+    download_dir = config["download_directory"]
+    targets = []
+    if os.path.isdir(download_dir):
+        targets += [(os.path.join(download_dir, name), None) for name in sorted(os.listdir(download_dir))
+                    if name.startswith("KAHC_") and name.lower().endswith(".pdf")]
+    if config.get("pdf_store", {}).get("enabled"):
+        from pdf_store import open_pdf_store
+        store = open_pdf_store(config)
+        targets += [(os.path.join(store.root, path), sha256) for sha256, path, _ in store.entries()]
+
+    for path, sha256 in targets:
+        checked += 1
+        try:
+            verify_pdf(path)
+            if args.hash and sha256 and sha256_of(path) != sha256:
+                raise InvalidPdf("checksum does not match the manifest")
+        except (InvalidPdf, OSError) as e:
+            problems.append((path, e))
+    for path, error in problems:
+        print(f"  {path}: {error}")
+    print(f"Verified {checked} PDFs, {len(problems)} problems")
+    return 1 if problems else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="khc", description="Karnataka High Court judgment crawler")
+    parser.add_argument("--config", default=os.getenv("KHC_CONFIG", DEFAULT_CONFIG), help="config file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("crawl", help="crawl the configured month")
+    commands.add_parser("resume", help="reset failed rows and crawl again")
+    status = commands.add_parser("status", help="show progress without starting a browser")
+    status.add_argument("--failures", type=int, default=10, help="failed rows to list")
+    export = commands.add_parser("export", help="rebuild the results workbook")
+    export.add_argument("--output", help="write here instead of excel_path (.xlsx or .csv)")
+    verify = commands.add_parser("verify", help="check downloaded PDFs are complete")
+    verify.add_argument("--hash", action="store_true", help="also recompute SHA-256 checksums")
+    args = parser.parse_args(argv)
+
+    handlers = {"crawl": cmd_crawl, "resume": cmd_resume, "status": cmd_status,
+                "export": cmd_export, "verify": cmd_verify}
+    return handlers[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+from collections import deque
+from datetime import datetime, timedelta
+
+DATE_FORMAT = "%d/%m/%Y"  # same as date_config["from_date"]
+GRANULARITY_DAYS = {"day": 1, "week": 7}
+DEFAULT_MAX_ROWS = 300
+
+
+def parse_date(value):
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+
+def format_date(value):
+    return value.strftime(DATE_FORMAT)
+
+
+def initial_windows(start, end, granularity="week"):
+    """Split start..end (inclusive dates) into day or week sized windows"""
+    if granularity == "month":
+        return [(start, end)]
+    step = timedelta(days=GRANULARITY_DAYS[granularity])
+    windows = []
+    while start <= end:
+        window_end = min(end, start + step - timedelta(days=1))
+        windows.append((start, window_end))
+        start = window_end + timedelta(days=1)
+    return windows
+
+
+def halve(start, end):
+    middle = start + timedelta(days=(end - start).days // 2)
+    return (start, middle), (middle + timedelta(days=1), end)
+
+
+def window_serials(entry):
+    """Global serials covered by a planned window"""
+    return range(entry["offset"] + 1, entry["offset"] + entry["count"] + 1)
+
+
+def plan_search(config):
+    """What a window plan was made for: bench and date range"""
+    return {"bench": config.get("bench", ""),
+            "from_date": config["date_config"]["from_date"],
+            "to_date": config["date_config"]["to_date"]}
+
+
+def saved_plan(config):
+    """config["window_plan"] if it still applies to config's bench and dates, else a fresh empty plan
+
+    Operators edit date_config for each new month; replaying last month's
+    windows would search the wrong dates and start the serials at its total.
+    A plan stays valid when only to_date moved later.
+    """
+    plan = config.get("window_plan") or []
+    made_for = config.get("window_plan_search") or {}
+    current = plan_search(config)
+    valid = (
+        plan
+        and made_for.get("bench", current["bench"]) == current["bench"]
+        and plan[0]["from_date"] == current["from_date"]
+        and parse_date(plan[-1]["to_date"]) <= parse_date(current["to_date"])
+    )
+    if plan and not valid:
+        print(f"Discarding the window plan for {plan[0]['from_date']} - {plan[-1]['to_date']}, "
+              f"the configured search is {current['from_date']} - {current['to_date']}")
+    config["window_plan"] = plan if valid else []
+    config["window_plan_search"] = current
+    return config["window_plan"]
+
+
+def walk_windows(date_config, plan, search, needed, max_rows=DEFAULT_MAX_ROWS, granularity="week"):
+    """Yield (entry, records) for each date window in order
+
+    plan holds windows finalized by earlier runs ({from_date, to_date,
+    count, offset}); they are replayed as-is so global serials stay the
+    same, and search() is only called for those that needed(entry). New
+    windows are searched, halved while they return more than max_rows
+    and appended to plan. A window's rows get global serials
+    offset + 1 .. offset + count, in the order the table lists them.
+    """
+    for entry in plan:
+        if not needed(entry):
+            continue
+        records = search(entry["from_date"], entry["to_date"])
+        if len(records) != entry["count"]:
+            print(f"Window {entry['from_date']}-{entry['to_date']} now has {len(records)} rows, "
+                  f"planned {entry['count']}; serials may have shifted")
+        yield entry, records
+
+    end = parse_date(date_config["to_date"])
+    if plan:
+        start = parse_date(plan[-1]["to_date"]) + timedelta(days=1)
+        offset = plan[-1]["offset"] + plan[-1]["count"]
+    else:
+        start = parse_date(date_config["from_date"])
+        offset = 0
+
+    pending = deque(initial_windows(start, end, granularity))
+    while pending:
+        window_start, window_end = pending.popleft()
+        records = search(format_date(window_start), format_date(window_end))
+        if len(records) > max_rows and window_start < window_end:
+            first, second = halve(window_start, window_end)
+            print(f"{len(records)} rows for {format_date(window_start)}-{format_date(window_end)}, splitting window")
+            pending.appendleft(second)
+            pending.appendleft(first)
+            continue
+
+        entry = {
+            "from_date": format_date(window_start),
+            "to_date": format_date(window_end),
+            "count": len(records),
+            "offset": offset,
+        }
+        offset += len(records)
+        plan.append(entry)
+        yield entry, records
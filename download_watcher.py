@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import struct
+import select
+import threading
+from collections import deque
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+PARTIAL_SUFFIXES = ('.crdownload', '.part', '.tmp')
+# Files we write ourselves (renamed judgments, HTTP downloads) are not browser downloads
+OWN_PREFIX = 'KAHC_'
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def is_partial(name):
+    return name.lower().endswith(PARTIAL_SUFFIXES)
+
+
+def is_browser_partial(name):
+    return is_partial(name) and not name.startswith(OWN_PREFIX)
+
+
+def is_browser_pdf(name):
+    return name.lower().endswith('.pdf') and not name.startswith(OWN_PREFIX)
+
+
+class DownloadWatcher:
+    """Tracks browser downloads in one directory from filesystem events
+
+    Call reset() before clicking; started() and finished() then report
+    activity and completed PDFs seen since, without listing the directory.
+    Completed PDFs are handed out in the order they finished.
+    Uses inotify on Linux and falls back to polling elsewhere.
+    """
+
+    def __init__(self, directory, poll_interval=0.5):
+        self.directory = str(directory)
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.events = 0  # download activity seen since reset()
+        self.completed = deque()
+        self.partials = set()  # browser partial files created since reset() and still there
+        self.running = True
+        self.backend = 'inotify' if sys.platform.startswith('linux') and self.start_inotify() else 'polling'
+        if self.backend == 'polling':
+            # Listed here, not in the thread, so a file created right after we return isn't missed
+            self.thread = threading.Thread(target=self.poll_loop, args=(set(os.listdir(self.directory)),),
+                                           name='download-watcher', daemon=True)
+            self.thread.start()
+        print(f"Watching {self.directory} for downloads ({self.backend})")
+
+    # Shared event handling
+
+    def on_started(self):
+        with self.lock:
+            self.events += 1
+
+    def on_finished(self, name):
+        path = os.path.join(self.directory, name)
+        try:
+            if os.path.getsize(path) == 0:
+                return
+        except OSError:
+            return
+        with self.lock:
+            self.events += 1
+            self.completed.append(path)
+
+    def reset(self):
+        """Forget earlier activity; only safe while no download is in flight"""
+        with self.lock:
+            self.events = 0
+            self.completed.clear()
+            # A partial left over from a crashed or cancelled download never finishes
+            self.partials.clear()
+
+    def activity(self):
+        with self.lock:
+            return self.events
+
+    def started(self, since=0):
+        """Whether there has been download activity after activity() returned since"""
+        with self.lock:
+            return self.events > since
+
+    def finished(self):
+        """Path of a PDF completed since reset(), or None"""
+        with self.lock:
+            while self.completed:
+                path = self.completed.popleft()
+                if os.path.exists(path):
+                    return path
+            return None
+
+    def stop(self):
+        self.running = False
+
+    # inotify backend
+
+    def start_inotify(self):
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC)
+            if fd < 0:
+                return False
+            mask = IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO
+            if libc.inotify_add_watch(fd, self.directory.encode(), mask) < 0:
+                os.close(fd)
+                return False
+        except Exception as e:
+            print(f"inotify unavailable ({e}), polling {self.directory} instead")
+            return False
+        self.fd = fd
+        self.thread = threading.Thread(target=self.inotify_loop, name='download-watcher', daemon=True)
+        self.thread.start()
+        return True
+
+    def inotify_loop(self):
+        try:
+            while self.running:
+                ready, _, _ = select.select([self.fd], [], [], self.poll_interval)
+                if not ready:
+                    continue
+                data = os.read(self.fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = data[offset:offset + length].rstrip(b'\0').decode(errors='replace')
+                    offset += length
+                    self.on_inotify_event(mask, name)
+        finally:
+            os.close(self.fd)
+
+    def on_inotify_event(self, mask, name):
+        if mask & IN_CREATE and (is_partial(name) or is_browser_pdf(name)):
+            self.on_started()
+        if mask & (IN_MOVED_TO | IN_CLOSE_WRITE) and is_browser_pdf(name):
+            # .crdownload -> .pdf rename, or a PDF written directly and closed
+            self.on_finished(name)
+
+    # Polling fallback: only lists the directory when its mtime changes
+
+    def poll_loop(self, known):
+        last_mtime = None  # list once straight away, the directory may have changed since known
+        sizes = {}  # new PDF -> last seen size, until it stops growing
+        while self.running:
+            time.sleep(self.poll_interval)
+            mtime = os.stat(self.directory).st_mtime_ns
+            if mtime != last_mtime:
+                last_mtime = mtime
+                names = set(os.listdir(self.directory))
+                for name in names - known:
+                    if is_partial(name):
+                        self.on_started()
+                        if is_browser_partial(name):
+                            with self.lock:
+                                self.partials.add(name)
+                    elif is_browser_pdf(name):
+                        self.on_started()
+                        sizes[name] = -1
+                with self.lock:
+                    self.partials &= names
+                known = names
+            # Only partials that appeared while we watched can still turn into this PDF
+            with self.lock:
+                partial_left = bool(self.partials)
+            for name in list(sizes):
+                try:
+                    size = os.path.getsize(os.path.join(self.directory, name))
+                except OSError:
+                    del sizes[name]
+                    continue
+                if size == sizes[name] and not partial_left:
+                    del sizes[name]
+                    self.on_finished(name)
+                else:
+                    sizes[name] = size
+
+
+def watcher_for(directory):
+    """The running watcher for directory, started on first use"""
+    directory = str(directory)
+    with _watchers_lock:
+        if directory not in _watchers:
+            _watchers[directory] = DownloadWatcher(directory)
+        return _watchers[directory]
+
+
+def stop_watchers():
+    with _watchers_lock:
+        for watcher in _watchers.values():
+            watcher.stop()
+        _watchers.clear()
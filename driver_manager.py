@@ -0,0 +1,153 @@
+import time
+
+# Heavy resources the crawler never looks at. PNGs are left alone because
+# the captcha image may be one; it is the only image we need.
+DEFAULT_BLOCKED_URLS = [
+    "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*",
+]
+
+LIGHT_ARGUMENTS = [
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "--disk-cache-size=1",
+    "--media-cache-size=1",
+    "--no-first-run",
+    "--mute-audio",
+    "--metrics-recording-only",
+]
+
+DEFAULT_MEMORY_CHECK_EVERY = 50  # rows between memory checks
+
+
+def apply_light_profile(chrome_options, browser_config):
+    """Headless and trimmed-down Chrome flags, as configured in config["browser"]"""
+    if browser_config.get("headless"):
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1366,900")
+    if browser_config.get("lightweight", True):
+        for argument in LIGHT_ARGUMENTS:
+            chrome_options.add_argument(argument)
+
+
+def prepare_driver(driver, browser_config, download_directory):
+    """Per-session tweaks that need a running browser: downloads and URL blocking"""
+    try:
+        # Headless Chrome ignores the download prefs unless told explicitly
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow", "downloadPath": str(download_directory), "eventsEnabled": True,
+        })
+    except Exception as e:
+        print(f"Could not set download behaviour: {e}")
+
+    if browser_config.get("block_resources", True):
+        patterns = browser_config.get("blocked_urls", DEFAULT_BLOCKED_URLS)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+            driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+            print(f"Blocking {len(patterns)} resource patterns")
+        except Exception as e:
+            print(f"Resource blocking unavailable: {e}")
+
+
+class DriverManager:
+    """Owns the browser and restarts it after recycle_after_rows rows or above max_memory_mb
+
+    start() must return a ready driver; whoever calls recycle() is
+    responsible for re-opening the search in the new browser.
+    """
+
+    def __init__(self, start, recycle_after_rows=0, max_memory_mb=0,
+                 memory_check_every=DEFAULT_MEMORY_CHECK_EVERY):
+        self.start_driver = start
+        self.recycle_after_rows = recycle_after_rows
+        self.max_memory_mb = max_memory_mb
+        self.memory_check_every = memory_check_every
+        self.driver = None
+        self.rows = 0
+        self.recycles = 0
+
+    def start(self):
+        self.driver = self.start_driver()
+        self.rows = 0
+        return self.driver
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+            self.driver = None
+
+    def batch_size(self, total):
+        """How many rows to process before asking needs_recycle() again"""
+        sizes = [total]
+        if self.recycle_after_rows:
+            sizes.append(self.recycle_after_rows)
+        if self.max_memory_mb:
+            sizes.append(self.memory_check_every)
+        return max(1, min(sizes))
+
+    def rows_done(self, count=1):
+        self.rows += count
+
+    def memory_mb(self):
+        """Resident memory of chromedriver and every browser process under it"""
+        try:
+            import psutil
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            total = 0
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total / 1024 / 1024
+        except ImportError:
+            # Without psutil the page's JS heap is the best signal we have
+            heap = self.driver.execute_script(
+                "return performance.memory ? performance.memory.usedJSHeapSize : 0;")
+            return (heap or 0) / 1024 / 1024
+        except Exception:
+            return 0
+
+    def needs_recycle(self):
+        if self.recycle_after_rows and self.rows >= self.recycle_after_rows:
+            print(f"Browser has handled {self.rows} rows, recycling it")
+            return True
+        if self.max_memory_mb:
+            memory = self.memory_mb()
+            if memory > self.max_memory_mb:
+                print(f"Browser is using {memory:.0f} MB (limit {self.max_memory_mb} MB), recycling it")
+                return True
+        return False
+
+    def recycle(self):
+        start = time.monotonic()
+        self.quit()
+        self.start()
+        self.recycles += 1
+        print(f"Browser restarted in {time.monotonic() - start:.1f}s (recycle #{self.recycles})")
+        return self.driver
+
+
+def driver_manager(config, start):
+    browser_config = config.get("browser", {})
+    return DriverManager(
+        start,
+        recycle_after_rows=browser_config.get("recycle_after_rows", 0),
+        max_memory_mb=browser_config.get("max_memory_mb", 0),
+        memory_check_every=browser_config.get("memory_check_every", DEFAULT_MEMORY_CHECK_EVERY),
+    )
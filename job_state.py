@@ -0,0 +1,127 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+PENDING = 'pending'
+DOWNLOADED = 'downloaded'
+NOT_AVAILABLE = 'not-available'
+FAILED = 'failed'
+DONE_STATUSES = (DOWNLOADED, NOT_AVAILABLE)
+
+# Excel "PDF Status" -> job status
+STATUS_FROM_EXCEL = {'DOWNLOADED': DOWNLOADED, 'NOT AVAILABLE': NOT_AVAILABLE}
+
+
+class JobState:
+    """One durable record per serial: status, attempts, last error and next retry time"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                serial INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT NOT NULL DEFAULT '',
+                next_attempt REAL NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def seed(self, serials, recorded_rows=()):
+        """Add missing serials, taking their status from result rows saved before the store existed
+
+        Serials without a DOWNLOADED or NOT AVAILABLE row start pending;
+        downloaded_pdf_number is no guide, older runs moved it past failed rows.
+        """
+        recorded = {}
+        for row in recorded_rows:
+            status = STATUS_FROM_EXCEL.get(row[6]) if len(row) > 6 else None
+            if status and str(row[0]).isdigit():
+                recorded[int(row[0])] = status
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (serial, status, updated_at) VALUES (?, ?, ?)",
+                [(serial, recorded.get(serial, PENDING), now) for serial in serials],
+            )
+
+    def mark(self, serial, status, error=''):
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO jobs (serial, status, attempts, last_error, updated_at) VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT(serial) DO UPDATE SET
+                    status = excluded.status, attempts = attempts + 1,
+                    last_error = excluded.last_error, updated_at = excluded.updated_at
+                WHERE jobs.status != excluded.status OR excluded.status = 'failed'
+            """, (serial, status, error, now))
+
+    def mark_rows(self, rows):
+        """Mark result rows (as written by the results sink) done"""
+        for row in rows:
+            status = STATUS_FROM_EXCEL.get(row[6])
+            if status:
+                self.mark(row[0], status)
+
+    def mark_failed(self, serial, error, backoff=30):
+        """Record a failure and schedule the retry with exponential backoff"""
+        self.mark(serial, FAILED, str(error))
+        with self.lock, self.conn:
+            attempts = self.conn.execute(
+                "SELECT attempts FROM jobs WHERE serial = ?", (serial,)).fetchone()[0]
+            self.conn.execute("UPDATE jobs SET next_attempt = ? WHERE serial = ?",
+                              (time.time() + backoff * 2 ** (attempts - 1), serial))
+
+    def outstanding(self, serials):
+        """Serials that are not downloaded or known to be unavailable, in order"""
+        wanted = set(serials)
+        with self.lock:
+            done = {serial for (serial,) in self.conn.execute(
+                f"SELECT serial FROM jobs WHERE status IN ({', '.join('?' for _ in DONE_STATUSES)})",
+                DONE_STATUSES)}
+        return sorted(wanted - done)
+
+    def retry_queue(self, serials, max_attempts):
+        """Failed serials that may be retried, as (serial, next_attempt) soonest first"""
+        wanted = set(serials)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT serial, next_attempt FROM jobs WHERE status = ? AND attempts < ? ORDER BY next_attempt",
+                (FAILED, max_attempts)).fetchall()
+        return [(serial, next_attempt) for serial, next_attempt in rows if serial in wanted]
+
+    def reset_failed(self):
+        """Give every failed serial a fresh set of attempts; returns how many"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock, self.conn:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, next_attempt = 0, updated_at = ? WHERE status = ?",
+                (PENDING, now, FAILED)).rowcount
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def failures(self, limit=20):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT serial, attempts, last_error FROM jobs WHERE status = ? ORDER BY serial LIMIT ?",
+                (FAILED, limit)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def job_state_path(config):
+    return config.get("job_state_path") or os.path.splitext(config["excel_path"])[0] + ".jobs.sqlite"
+
+
+def open_job_state(config):
+    return JobState(job_state_path(config))
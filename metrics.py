@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+PROMETHEUS_FILE = "metrics.prom"
+SUMMARY_DIR = "metrics_runs"
+REFRESH_INTERVAL = 15   # seconds between Prometheus file rewrites during a run
+PREFIX = "khc"
+# Stage latency histogram buckets (seconds); captcha and search are slow, clicks are fast
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_histograms = {}  # stage -> {"buckets": [...], "sum", "count", "failures"}
+_counters = {}    # (name, ((label, value), ...)) -> value
+_lock = threading.Lock()
+_run = {}
+_refresher = None
+
+
+def observe(stage, seconds, ok=True):
+    """Record one execution of a stage"""
+    with _lock:
+        entry = _histograms.setdefault(stage, {
+            "buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0, "failures": 0,
+        })
+        for n, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                entry["buckets"][n] += 1
+        entry["sum"] += seconds
+        entry["count"] += 1
+        if not ok:
+            entry["failures"] += 1
+
+
+@contextmanager
+def timed(stage):
+    """Time the block as one execution of stage; an exception counts as a failure"""
+    start = time.monotonic()
+    try:
+        yield
+    except BaseException:
+        observe(stage, time.monotonic() - start, ok=False)
+        raise
+    observe(stage, time.monotonic() - start)
+
+
+def count(name, amount=1, **labels):
+    """Add to a counter, e.g. count("rows", status="downloaded") or count("bytes", 1024)"""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def count_row(case_data):
+    """Count a recorded row by its PDF status"""
+    count("rows", status=case_data.get("pdf_status", "unknown").lower().replace(" ", "_"))
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def snapshot():
+    """Current metrics as plain data, with latency percentiles estimated from the buckets"""
+    with _lock:
+        stages = {}
+        for stage, entry in sorted(_histograms.items()):
+            stages[stage] = {
+                "count": entry["count"],
+                "failures": entry["failures"],
+                "total_seconds": round(entry["sum"], 3),
+                "avg_seconds": round(entry["sum"] / entry["count"], 3) if entry["count"] else 0,
+                "p50_seconds": bucket_percentile(entry, 0.50),
+                "p95_seconds": bucket_percentile(entry, 0.95),
+                "buckets": dict(zip((str(bound) for bound in BUCKETS), entry["buckets"])),
+            }
+        counters = {}
+        for (name, labels), value in sorted(_counters.items()):
+            key = name + ''.join(f"{{{label}={value_}}}" for label, value_ in labels)
+            counters[key] = value
+    return {"stages": stages, "counters": counters}
+
+
+def bucket_percentile(entry, fraction):
+    """Upper bound of the bucket holding the given fraction of observations"""
+    target = entry["count"] * fraction
+    for bound, cumulative in zip(BUCKETS, entry["buckets"]):
+        if cumulative >= target and cumulative:
+            return bound
+    return None  # beyond the last bucket
+
+
+def prometheus_text():
+    """Metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+
+    name = f"{PREFIX}_stage_seconds"
+    lines += [f"# HELP {name} Time spent in each crawl stage.", f"# TYPE {name} histogram"]
+    for stage, entry in histograms:
+        for bound, cumulative in zip(BUCKETS, entry["buckets"]):
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {entry["count"]}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {entry["sum"]:.6f}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {entry["count"]}')
+
+    name = f"{PREFIX}_stage_failures_total"
+    lines += [f"# HELP {name} Stage executions that raised or gave no result.", f"# TYPE {name} counter"]
+    for stage, entry in histograms:
+        lines.append(f'{name}{{stage="{stage}"}} {entry["failures"]}')
+
+    declared = set()
+    for (counter, labels), value in counters:
+        metric = f"{PREFIX}_{counter}_total"
+        if metric not in declared:
+            declared.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        label_text = ','.join(f'{label}="{value_}"' for label, value_ in labels)
+        lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+
+    if _run:
+        lines += [f"# TYPE {PREFIX}_run_start_time_seconds gauge",
+                  f"{PREFIX}_run_start_time_seconds {_run['started']:.0f}"]
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path=PROMETHEUS_FILE):
+    """Rewrite the Prometheus file atomically, so a collector never reads half a file"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(temp_path, path)
+
+
+def refresh_loop(stop, path, interval):
+    while not stop.wait(interval):
+        try:
+            write_prometheus(path)
+        except Exception as e:
+            print(f"Could not write metrics to {path}: {e}")
+
+
+def start_run(config, name="run"):
+    """Reset metrics and keep the Prometheus file (config["metrics"]) fresh until finish_run"""
+    global _refresher
+    metrics_config = config.get("metrics", {})
+    reset()
+    _run.clear()
+    _run.update({
+        "name": name,
+        "started": time.time(),
+        "enabled": metrics_config.get("enabled", True),
+        "prometheus_path": metrics_config.get("prometheus_path", PROMETHEUS_FILE),
+        "summary_dir": metrics_config.get("summary_dir", SUMMARY_DIR),
+    })
+    if name != "run":
+        # Worker processes export next to the main file, one file each
+        base, ext = os.path.splitext(_run["prometheus_path"])
+        _run["prometheus_path"] = f"{base}.{name}{ext}"
+    if not _run["enabled"]:
+        return
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=refresh_loop, name="metrics-refresh", daemon=True,
+        args=(stop, _run["prometheus_path"], metrics_config.get("refresh_interval", REFRESH_INTERVAL)))
+    thread.start()
+    _refresher = (stop, thread)
+
+
+def finish_run():
+    """Stop refreshing, write the final Prometheus file and the run's JSON summary; returns its path"""
+    global _refresher
+    if _refresher:
+        stop, thread = _refresher
+        stop.set()
+        thread.join()
+        _refresher = None
+    if not _run.get("enabled"):
+        return None
+
+    write_prometheus(_run["prometheus_path"])
+    finished = time.time()
+    summary = {
+        "run": _run["name"],
+        "started": datetime.fromtimestamp(_run["started"]).isoformat(timespec='seconds'),
+        "finished": datetime.fromtimestamp(finished).isoformat(timespec='seconds'),
+        "seconds": round(finished - _run["started"], 1),
+        **snapshot(),
+    }
+    os.makedirs(_run["summary_dir"], exist_ok=True)
+    stamp = datetime.fromtimestamp(_run["started"]).strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(_run["summary_dir"], f"{_run['name']}_{stamp}.json")
+    with open(path, 'w') as f:
+        json.dump(summary, f, indent=4)
+    return path
+
+
+def print_summary():
+    data = snapshot()
+    print("\nStage timings:")
+    for stage, entry in data["stages"].items():
+        p95 = entry["p95_seconds"]
+        print(f"  {stage}: n={entry['count']} failures={entry['failures']} "
+              f"avg={entry['avg_seconds']:.2f}s p95<={p95 if p95 is not None else '>' + str(BUCKETS[-1])}s")
+    for name, value in data["counters"].items():
+        print(f"  {name}: {value}")
@@ -0,0 +1,336 @@
+"""Local stand-in for the judgment portal, for benchmarks and offline testing
+
+Serves rep_judgment.php with the same absolute XPaths new.py uses (bench
+select, date inputs, captcha, search button, results table, PDF buttons
+and the swal2 "record not found" popup), backed by generated rows.
+
+    python mock_portal.py --rows 2354 --port 8765
+    set KHC_WEBSITE_URL=http://127.0.0.1:8765/newwebsite/rep_judgment.php
+"""
+import io
+import json
+import time
+import zlib
+import struct
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PAGE_PATH = "/newwebsite/rep_judgment.php"
+DATE_FORMAT = "%d/%m/%Y"
+
+PAGE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<title>Judgments - Mock Portal</title>
+<style>
+  .swal2-container { position: fixed; inset: 0; background: rgba(0,0,0,.4); z-index: 1000; }
+  .swal2-popup { background: #fff; width: 300px; margin: 120px auto; padding: 20px; }
+  .filler { display: none; }
+</style>
+<script>
+function showSwal(message) {
+  var container = document.createElement('div');
+  container.className = 'swal2-container';
+  container.innerHTML = '<div class="swal2-popup"><div class="swal2-icon"></div>' +
+    '<div class="swal2-title">Alert</div><div class="swal2-html-container">' + message + '</div>' +
+    '<div></div><div></div><div class="swal2-actions">' +
+    '<button type="button" class="swal2-confirm" onclick="closeSwal()">OK</button>' +
+    '<button type="button" class="swal2-cancel" onclick="closeSwal()">Cancel</button></div></div>';
+  document.body.appendChild(container);
+}
+function closeSwal() {
+  var container = document.querySelector('.swal2-container');
+  if (container) { container.remove(); }
+}
+function search() {
+  var body = new URLSearchParams({
+    bench: document.getElementById('bench').value,
+    from_date: document.getElementById('from_date').value,
+    to_date: document.getElementById('to_date').value,
+    captcha: document.getElementById('captcha_code').value
+  });
+  document.getElementById('resultRows').innerHTML = '';
+  fetch('search.php', {method: 'POST', body: body}).then(function (r) { return r.json(); }).then(function (data) {
+    if (data.error) { showSwal(data.error); return; }
+    // Rows arrive in chunks, like a slow server-side render
+    var rows = data.rows, tbody = document.getElementById('resultRows'), chunk = data.chunk;
+    function addChunk(start) {
+      var html = '';
+      for (var i = start; i < Math.min(start + chunk, rows.length); i++) { html += rows[i]; }
+      tbody.insertAdjacentHTML('beforeend', html);
+      if (start + chunk < rows.length) { setTimeout(function () { addChunk(start + chunk); }, data.chunk_delay_ms); }
+    }
+    addChunk(0);
+  });
+}
+function downloadPdf(url) {
+  fetch(url + '&check=1').then(function (r) { return r.json(); }).then(function (data) {
+    if (data.ok) { window.location.href = url; } else { showSwal('Record not found'); }
+  });
+}
+</script>
+</head>
+<body>
+<div class="page">
+  <div class="header">High Court of Karnataka (mock)</div>
+  <div class="content">
+    <div class="main">
+      <div class="title">Judgments</div>
+      <div class="bench-row">
+        <div>Bench</div>
+        <div>:</div>
+        <div><select id="bench"><option value="">Select Bench</option><option value="B">Principal Bench</option><option value="D">Dharwad Bench</option><option value="K">Kalaburagi Bench</option></select></div>
+      </div>
+      <form id="searchForm" onsubmit="return false;">
+        <div>Search by date of judgment</div>
+        <div>
+          <div>Criteria</div>
+          <div>
+            <div class="filler"></div>
+            <div class="filler"></div>
+            <div class="filler"></div>
+            <div class="filler"></div>
+            <div class="filler"></div>
+            <div>
+              <div>From date</div>
+              <div><div><input type="text" id="from_date" name="from_date"/></div></div>
+              <div>To date</div>
+              <div><div><input type="text" id="to_date" name="to_date"/></div></div>
+            </div>
+            <div class="filler"></div>
+            <div>
+              <div>Captcha</div>
+              <div><img id="captcha" src="captcha.php" alt="captcha"/></div>
+              <div>Enter captcha</div>
+              <div><div><input type="text" id="captcha_code" name="captcha"/></div></div>
+            </div>
+            <div>
+              <div></div>
+              <div><button type="button" onclick="search()">Search</button><button type="reset">Reset</button></div>
+            </div>
+          </div>
+        </div>
+      </form>
+      <div class="spacer"></div>
+      <div id="results">
+        <div><div><div>
+          <div>Search results</div>
+          <div>
+            <div>
+              <div class="info"></div>
+              <div>
+                <table>
+                  <thead><tr><th>#</th><th>Bench</th><th>Case No</th><th>Year</th><th>Type</th><th>Parties</th><th>Advocate</th><th>Judge</th><th>Decision Date</th><th>Disposal</th><th>Act</th><th>Section</th><th>Category</th><th>Citation</th><th>Judgment</th></tr></thead>
+                  <tbody id="resultRows"></tbody>
+                </table>
+              </div>
+            </div>
+          </div>
+        </div></div></div>
+      </div>
+    </div>
+  </div>
+</div>
+<div class="filler"></div>
+<div class="filler"></div>
+<div class="filler"></div>
+<div class="filler"></div>
+<div class="filler"></div>
+<div class="filler"></div>
+<div class="filler"></div>
+</body>
+</html>
+"""
+
+ROW_HTML = ("<tr><td>{n}</td><td>B</td><td><button type=\"button\"><u>{case_no}</u></button></td>"
+            "<td><button type=\"button\"><u>{year}</u></button></td><td>J</td><td>{parties}</td><td>-</td>"
+            "<td>{judge}</td><td>{date}</td><td>Disposed</td><td>-</td><td>-</td><td>-</td><td>-</td>"
+            "<td><button type=\"button\" onclick=\"downloadPdf('pdf.php?id={id}')\">PDF</button></td></tr>")
+
+JUDGES = ["HON'BLE MR JUSTICE A", "HON'BLE MRS JUSTICE B", "HON'BLE MR JUSTICE C"]
+CASE_TYPES = ["WP", "RFA", "CRL.P", "MFA", "RSA"]
+
+
+def png_bytes(width=120, height=40, text=None):
+    """Captcha image: digits drawn with Pillow when available, else a blank PNG"""
+    try:
+        from PIL import Image, ImageDraw
+        image = Image.new('L', (width, height), 230)
+        draw = ImageDraw.Draw(image)
+        for k, ch in enumerate(text or ''):
+            draw.text((8 + k * 18, 14), ch, fill=20)
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG')
+        return buffer.getvalue()
+    except ImportError:
+        raw = b''.join(b'\x00' + b'\xe6' * width for _ in range(height))
+
+        def chunk(kind, data):
+            return (struct.pack('>I', len(data)) + kind + data
+                    + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+        return (b'\x89PNG\r\n\x1a\n'
+                + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+                + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def pdf_bytes(case_id, size):
+    """A PDF of roughly size bytes with a proper %%EOF trailer"""
+    head = f"%PDF-1.4\n% mock judgment {case_id}\n".encode()
+    tail = b"\ntrailer\n<< >>\n%%EOF\n"
+    padding = max(0, size - len(head) - len(tail))
+    return head + b"%" + b"0" * max(0, padding - 1) + tail
+
+
+class MockPortal:
+    """Generated judgments plus an HTTP server serving them the way the portal does"""
+
+    def __init__(self, rows=100, from_date="01/02/2025", to_date="28/02/2025", captcha="123456",
+                 search_latency=0.5, chunk=500, chunk_delay_ms=50, pdf_latency=0.2, pdf_size=200_000,
+                 missing_every=20, host="127.0.0.1", port=0):
+        self.captcha = captcha
+        self.search_latency = search_latency
+        self.chunk = chunk
+        self.chunk_delay_ms = chunk_delay_ms
+        self.pdf_latency = pdf_latency
+        self.pdf_size = pdf_size
+        self.cases = self.generate(rows, from_date, to_date, missing_every)
+        self.by_id = {case['id']: case for case in self.cases}
+        self.stats = {"searches": 0, "pdfs": 0, "pdf_bytes": 0}
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.thread = None
+
+    @staticmethod
+    def generate(rows, from_date, to_date, missing_every):
+        start = datetime.strptime(from_date, DATE_FORMAT)
+        days = (datetime.strptime(to_date, DATE_FORMAT) - start).days + 1
+        cases = []
+        for n in range(rows):
+            cases.append({
+                "id": n + 1,
+                "case_no": f"{CASE_TYPES[n % len(CASE_TYPES)]} {10000 + n}",
+                "year": str(2018 + n % 7),
+                "parties": f"PETITIONER {n + 1} VS RESPONDENT {n + 1}",
+                "judge": JUDGES[n % len(JUDGES)],
+                "date": start + timedelta(days=n * days // max(rows, 1)),
+                "available": not (missing_every and (n + 1) % missing_every == 0),
+            })
+        return cases
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{PAGE_PATH}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="mock-portal", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def search(self, form):
+        time.sleep(self.search_latency)
+        self.stats["searches"] += 1
+        if form.get("captcha") != self.captcha:
+            return {"error": "Invalid Captcha"}
+        if not form.get("bench"):
+            return {"error": "Please select bench"}
+        try:
+            start = datetime.strptime(form["from_date"], DATE_FORMAT)
+            end = datetime.strptime(form["to_date"], DATE_FORMAT)
+        except (KeyError, ValueError):
+            return {"error": "Please enter valid dates"}
+        matches = [case for case in self.cases if start <= case["date"] <= end]
+        if not matches:
+            return {"error": "Record not found"}
+        rows = [ROW_HTML.format(n=n, date=case["date"].strftime(DATE_FORMAT), **{
+                    key: case[key] for key in ("id", "case_no", "year", "parties", "judge")})
+                for n, case in enumerate(matches, 1)]
+        return {"rows": rows, "chunk": self.chunk, "chunk_delay_ms": self.chunk_delay_ms}
+
+    def handler_class(self):
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Set-Cookie", "PHPSESSID=mock; Path=/")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                name = url.path.rsplit('/', 1)[-1]
+                if url.path == PAGE_PATH:
+                    self.send(200, PAGE_HTML.encode(), "text/html; charset=utf-8")
+                elif name == "captcha.php":
+                    self.send(200, png_bytes(text=portal.captcha), "image/png")
+                elif name == "pdf.php":
+                    case = portal.by_id.get(int(query.get("id", 0) or 0))
+                    available = bool(case and case["available"])
+                    if "check" in query:
+                        self.send(200, json.dumps({"ok": available}).encode(), "application/json")
+                    elif not available:
+                        self.send(200, b"<html><body>Record not found</body></html>", "text/html")
+                    else:
+                        time.sleep(portal.pdf_latency)
+                        body = pdf_bytes(case["id"], portal.pdf_size)
+                        portal.stats["pdfs"] += 1
+                        portal.stats["pdf_bytes"] += len(body)
+                        self.send(200, body, "application/pdf", {
+                            "Content-Disposition": f'attachment; filename="judgment_{case["id"]}.pdf"'})
+                else:
+                    self.send(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+                if url.path.endswith("search.php"):
+                    self.send(200, json.dumps(portal.search(form)).encode(), "application/json")
+                else:
+                    self.send(404, b"not found", "text/plain")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the judgment portal")
+    parser.add_argument("--rows", type=int, default=1000, help="judgments in the date range")
+    parser.add_argument("--from-date", default="01/02/2025")
+    parser.add_argument("--to-date", default="28/02/2025")
+    parser.add_argument("--captcha", default="123456", help="the only captcha answer accepted")
+    parser.add_argument("--search-latency", type=float, default=0.5, help="seconds before results come back")
+    parser.add_argument("--pdf-latency", type=float, default=0.2, help="seconds before each PDF is served")
+    parser.add_argument("--pdf-size", type=int, default=200_000, help="bytes per PDF")
+    parser.add_argument("--missing-every", type=int, default=20, help="every Nth judgment is 'record not found'")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    portal = MockPortal(rows=args.rows, from_date=args.from_date, to_date=args.to_date, captcha=args.captcha,
+                        search_latency=args.search_latency, pdf_latency=args.pdf_latency,
+                        pdf_size=args.pdf_size, missing_every=args.missing_every,
+                        host=args.host, port=args.port)
+    print(f"Mock portal serving {args.rows} judgments at {portal.url}")
+    try:
+        portal.server.serve_forever()
+    except KeyboardInterrupt:
+        portal.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,487 +1,1071 @@
-import os
-import sys
-import time
-import json
-import base64
-from datetime import datetime
-import requests
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from openpyxl import Workbook, load_workbook
-from openpyxl.utils import get_column_letter
-from selenium.webdriver.chrome.service import Service
-import google.generativeai as genai
-from dotenv import load_dotenv
-from pathlib import Path
-
-# Load environment variables and configure Gemini
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("No API key found. Please set the GEMINI_API_KEY environment variable.")
-
-genai.configure(api_key=api_key)
-
-generation_config = {
-    "temperature": 1,
-    "top_p": 0.95,
-    "top_k": 40,
-    "max_output_tokens": 8192,
-}
-
-model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash",
-    generation_config=generation_config,
-)
-
-# Constants
-CONFIG_FILE = "new.json"
-WEBSITE_URL = "https://karnatakajudiciary.kar.nic.in/newwebsite/rep_judgment.php"
-
-def load_config():
-    with open(CONFIG_FILE, 'r') as f:
-        return json.load(f)
-
-def save_config(config):
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=4)
-
-def setup_driver():
-    config = load_config()
-    
-    # Create download directory if it doesn't exist
-    download_dir = config["download_directory"]
-    if not os.path.exists(download_dir):
-        print(f"Creating download directory: {download_dir}")
-        os.makedirs(download_dir, exist_ok=True)
-    
-    chrome_options = webdriver.ChromeOptions()
-    
-    # Enhanced download preferences
-    chrome_options.add_experimental_option('prefs', {
-        "download.default_directory": config["download_directory"],
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True,
-        "plugins.always_open_pdf_externally": True,
-        # Force PDF to download instead of opening in browser
-        "download.extensions_to_open": "",
-        "browser.download.manager.showWhenStarting": False,
-        "browser.download.manager.focusWhenStarting": False,
-        "browser.download.manager.useWindow": False,
-        "browser.helperApps.neverAsk.saveToDisk": "application/pdf",
-        "pdfjs.disabled": True
-    })
-    
-    # Add more compatibility options
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--disable-software-rasterizer')
-    chrome_options.add_argument('--disable-extensions')
-    chrome_options.add_experimental_option("detach", True)
-    chrome_options.add_argument("--start-maximized")
-    chrome_options.add_argument('--ignore-certificate-errors')
-    chrome_options.add_argument('--ignore-ssl-errors')
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-    
-    print("Setting up Chrome driver...")
-    try:
-        # First try with default service
-        service = Service()
-        driver = webdriver.Chrome(options=chrome_options)
-        print("Chrome driver created successfully with default service")
-        return driver
-    except Exception as e1:
-        print(f"Failed with default service: {e1}")
-        try:
-            # Try with explicit chromedriver path
-            service = Service(executable_path=os.path.join(os.getcwd(), "chromedriver.exe"))
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            print("Chrome driver created successfully with explicit path")
-            return driver
-        except Exception as e2:
-            print(f"Failed with explicit path: {e2}")
-            print("\nTroubleshooting steps:")
-            print("1. Make sure Chrome is installed")
-            print("2. Download matching chromedriver from: https://googlechromelauncher.github.io/chromedriver/")
-            print("3. Place chromedriver.exe in the same folder as this script")
-            print("4. Your Chrome version: Check in Chrome menu > Help > About Google Chrome")
-            raise
-
-def solve_captcha_with_gemini(driver, wait):
-    try:
-        time.sleep(2)  # Wait before getting captcha
-        
-        # Get captcha image
-        captcha_img = wait.until(
-            EC.presence_of_element_located((By.XPATH, "//img[@id='captcha']"))
-        )
-        
-        # Take screenshot of captcha
-        driver.save_screenshot("captcha_temp.png")
-        
-        # Load the image for Gemini
-        with open("captcha_temp.png", "rb") as img_file:
-            image_data = {
-                "mime_type": "image/png",
-                "data": base64.b64encode(img_file.read()).decode('utf-8')
-            }
-
-        # Create message parts for Gemini
-        message_parts = [
-            "This is a captcha image containing exactly 6 digits. Return only these 6 digits, nothing else.",
-            image_data
-        ]
-
-        # Send to Gemini and get response
-        print("Sending captcha to Gemini...")
-        response = model.generate_content(message_parts)
-        captcha_text = response.text.strip()
-        print(f"Gemini identified captcha: {captcha_text}")
-        
-        if not captcha_text.isdigit() or len(captcha_text) != 6:
-            print("Invalid captcha text (not 6 digits)")
-            return False
-            
-        # Enter captcha
-        captcha_input = wait.until(
-            EC.presence_of_element_located((By.XPATH, "/html/body/div[1]/div[2]/div[1]/form/div[2]/div[2]/div[8]/div[4]/div/input"))
-        )
-        captcha_input.clear()
-        time.sleep(1)
-        captcha_input.send_keys(captcha_text)
-        time.sleep(2)
-        
-        # Clean up temporary file
-        if os.path.exists("captcha_temp.png"):
-            os.remove("captcha_temp.png")
-            
-        return True
-        
-    except Exception as e:
-        print(f"Error solving captcha: {e}")
-        if os.path.exists("captcha_temp.png"):
-            os.remove("captcha_temp.png")
-        return False
-
-def setup_excel():
-    """Setup Excel file with proper headers"""
-    config = load_config()
-    excel_path = config["excel_path"]
-    excel_dir = os.path.dirname(excel_path)
-    
-    if not os.path.exists(excel_dir):
-        os.makedirs(excel_dir, exist_ok=True)
-    
-    if not os.path.exists(excel_path):
-        wb = Workbook()
-        ws = wb.active
-        headers = ['SNo', 'Case No', 'Year', 'Case Title', 'Decision Date', 
-                  'Judge Name', 'PDF Status', 'PDF Filename', 'New Name']
-        
-        # Add headers and set column widths
-        for col, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col, value=header)
-            ws.column_dimensions[get_column_letter(col)].width = 15
-        
-        # Make some columns wider
-        ws.column_dimensions[get_column_letter(4)].width = 40  # Case Title
-        ws.column_dimensions[get_column_letter(8)].width = 30  # PDF Filename
-        ws.column_dimensions[get_column_letter(9)].width = 50  # New Name
-        
-        wb.save(excel_path)
-    return excel_path
-
-def update_excel(config, row_num, case_data):
-    """Add a row to Excel with case details"""
-    try:
-        excel_path = config["excel_path"]
-        wb = load_workbook(excel_path)
-        ws = wb.active
-        next_row = ws.max_row + 1
-        
-        # Write data to row
-        ws.cell(row=next_row, column=1, value=row_num)  # SNo
-        ws.cell(row=next_row, column=2, value=case_data.get('case_no', ''))
-        ws.cell(row=next_row, column=3, value=case_data.get('year', ''))
-        ws.cell(row=next_row, column=4, value=case_data.get('case_title', ''))
-        ws.cell(row=next_row, column=5, value=case_data.get('decision_date', ''))
-        ws.cell(row=next_row, column=6, value=case_data.get('judge_name', ''))
-        ws.cell(row=next_row, column=7, value=case_data.get('pdf_status', ''))
-        ws.cell(row=next_row, column=8, value=case_data.get('original_filename', ''))
-        ws.cell(row=next_row, column=9, value=case_data.get('new_filename', ''))
-        
-        wb.save(excel_path)
-        print(f"Updated Excel for case {row_num}")
-    except Exception as e:
-        print(f"Error updating Excel for case {row_num}: {e}")
-
-def remove_blocking_elements(driver):
-    """Remove elements that might block clicking PDF buttons"""
-    try:
-        blocker = driver.find_element(By.CLASS_NAME, "swal2-container")
-        driver.execute_script("arguments[0].remove();", blocker)
-    except:
-        pass
-
-def main():
-    config = load_config()
-    print("Starting automation...")
-    
-    # Setup Excel file first
-    setup_excel()  # Add this line to create Excel file at start
-    
-    # Create necessary directories
-    download_dir = config["download_directory"]
-    excel_dir = os.path.dirname(config["excel_path"])
-    
-    # Create directories if they don't exist
-    for dir_path in [download_dir, excel_dir]:
-        if not os.path.exists(dir_path):
-            print(f"Creating directory: {dir_path}")
-            os.makedirs(dir_path, exist_ok=True)
-    
-    try:
-        driver = setup_driver()
-        wait = WebDriverWait(driver, 20)
-        print("Driver setup complete, proceeding to website...")
-        
-        # Open website
-        driver.get(WEBSITE_URL)
-        print("Website loaded")
-        time.sleep(5)  # Initial wait after page load
-
-        # Select bench with proper delays
-        print("Selecting bench...")
-        bench_select = wait.until(
-            EC.element_to_be_clickable((By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[2]/div[3]/select"))
-        )
-        time.sleep(2)
-        bench_select.click()
-        time.sleep(3)
-        
-        print("Selecting Principal Bench...")
-        principal_bench = wait.until(
-            EC.element_to_be_clickable((By.XPATH, "/html/body/div[1]/div[2]/div[1]/div[2]/div[3]/select/option[2]"))
-        )
-        time.sleep(2)
-        principal_bench.click()
-        time.sleep(3)
-
-        # Enter dates with delays
-        print("Entering from date...")
-        from_date = wait.until(
-            EC.presence_of_element_located((By.XPATH, "/html/body/div[1]/div[2]/div[1]/form/div[2]/div[2]/div[6]/div[2]/div/input"))
-        )
-        time.sleep(2)
-        from_date.clear()
-        time.sleep(1)
-        from_date.send_keys(config["date_config"]["from_date"])
-        time.sleep(2)
-
-        print("Entering to date...")
-        to_date = wait.until(
-            EC.presence_of_element_located((By.XPATH, "/html/body/div[1]/div[2]/div[1]/form/div[2]/div[2]/div[6]/div[4]/div/input"))
-        )
-        time.sleep(2)
-        to_date.clear()
-        time.sleep(1)
-        to_date.send_keys(config["date_config"]["to_date"])
-        time.sleep(2)
-
-        # Solve captcha
-        print("Attempting to solve captcha...")
-        if not solve_captcha_with_gemini(driver, wait):
-            print("Failed to solve captcha")
-            input("Press Enter to try again...")
-            return
-
-        # Click search with delay
-        print("Clicking search button...")
-        search_button = wait.until(
-            EC.element_to_be_clickable((By.XPATH, "/html/body/div[1]/div[2]/div[1]/form/div[2]/div[2]/div[9]/div[2]/button[1]"))
-        )
-        time.sleep(2)
-        search_button.click()
-        
-        # Add longer wait for search results to load completely
-        print("Waiting for search results to load (60 seconds)...")
-        time.sleep(60)  # Wait for 60 seconds after search button click
-        
-        print("Starting PDF downloads...")
-        start_from = config["downloaded_pdf_number"] + 1
-        end_at = config["pdf_range"]["end_serial"]
-
-        for i in range(start_from, end_at + 1):
-            try:
-                print(f"Processing PDF {i}...")
-                time.sleep(2)
-                
-                # Collect case details first
-                case_data = {}
-                try:
-                    case_data['case_no'] = wait.until(
-                        EC.presence_of_element_located((By.XPATH, f"/html/body/div[1]/div[2]/div[1]/div[4]/div/div/div/div[2]/div/div[2]/table/tbody/tr[{i}]/td[3]/button/u"))
-                    ).text.strip()
-                    
-                    case_data['year'] = wait.until(
-                        EC.presence_of_element_located((By.XPATH, f"/html/body/div[1]/div[2]/div[1]/div[4]/div/div/div/div[2]/div/div[2]/table/tbody/tr[{i}]/td[4]/button/u"))
-                    ).text.strip()
-                    
-                    case_data['decision_date'] = wait.until(
-                        EC.presence_of_element_located((By.XPATH, f"/html/body/div[1]/div[2]/div[1]/div[4]/div/div/div/div[2]/div/div[2]/table/tbody/tr[{i}]/td[9]"))
-                    ).text.strip()
-                    
-                    case_data['judge_name'] = wait.until(
-                        EC.presence_of_element_located((By.XPATH, f"/html/body/div[1]/div[2]/div[1]/div[4]/div/div/div/div[2]/div/div[2]/table/tbody/tr[{i}]/td[8]"))
-                    ).text.strip()
-                    
-                    parties = wait.until(
-                        EC.presence_of_element_located((By.XPATH, f"/html/body/div[1]/div[2]/div[1]/div[4]/div/div/div/div[2]/div/div[2]/table/tbody/tr[{i}]/td[6]"))
-                    ).text.strip()
-                    case_data['case_title'] = parties
-                    
-                except Exception as e:
-                    print(f"Error collecting case details for row {i}: {e}")
-                    continue
-                
-                # Get list of files before download
-                download_dir = Path(config["download_directory"])
-                files_before = set(download_dir.glob('*.pdf'))
-                
-                # Before clicking PDF button, remove any blocking elements
-                remove_blocking_elements(driver)
-                
-                # Click PDF button
-                pdf_xpath = f"/html/body/div[1]/div[2]/div[1]/div[4]/div/div/div/div[2]/div/div[2]/table/tbody/tr[{i}]/td[15]/button"
-                pdf_button = wait.until(EC.element_to_be_clickable((By.XPATH, pdf_xpath)))
-                
-                # Scroll the button into view and ensure it's clickable
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", pdf_button)
-                time.sleep(1)
-                
-                # Try JavaScript click if regular click fails
-                try:
-                    pdf_button.click()
-                except:
-                    driver.execute_script("arguments[0].click();", pdf_button)
-                
-                time.sleep(2)
-                
-                # Check for record not found popup
-                try:
-                    ok_button = WebDriverWait(driver, 3).until(
-                        EC.element_to_be_clickable((By.XPATH, "/html/body/div[9]/div/div[6]/button[1]"))
-                    )
-                    ok_button.click()
-                    time.sleep(1)
-                    print(f"Record not found for PDF {i}, clicked OK")
-                    
-                    # Update Excel with NOT AVAILABLE status
-                    case_data['pdf_status'] = 'NOT AVAILABLE'
-                    case_data['original_filename'] = ''
-                    case_data['new_filename'] = ''
-                    update_excel(config, i, case_data)
-                    continue
-                    
-                except:
-                    # No popup found, proceed with download and renaming
-                    try:
-                        # Wait for download to complete (increased max time to 45 seconds)
-                        download_complete = False
-                        max_wait = 45  # Increased from 30 to 45 seconds
-                        print(f"Waiting for PDF {i} to download...")
-                        
-                        while max_wait > 0 and not download_complete:
-                            time.sleep(2)  # Check every 2 seconds instead of 1
-                            files_after = set(download_dir.glob('*.pdf'))
-                            new_files = files_after - files_before
-                            if new_files:
-                                print(f"PDF {i} download detected")
-                                download_complete = True
-                                # Add extra wait to ensure file is completely written
-                                time.sleep(3)  # Wait 3 more seconds after detection
-                                break
-                            max_wait -= 2
-                            if max_wait % 10 == 0:  # Log progress every 10 seconds
-                                print(f"Still waiting for PDF {i}... {max_wait} seconds remaining")
-                        
-                        if download_complete:
-                            # Get the new file
-                            new_file = list(new_files)[0]
-                            original_filename = new_file.name
-                            
-                            # Construct new filename
-                            parties_split = parties.split(" VS ", 1)
-                            first_party = parties_split[0].strip() if len(parties_split) > 0 else "PARTY1"
-                            second_party = parties_split[1].strip() if len(parties_split) > 1 else "PARTY2"
-                            
-                            new_filename = f"KAHC_{case_data['case_no']}_{case_data['year']}_{first_party}_VS_{second_party}.pdf"
-                            new_filename = "".join(c for c in new_filename if c.isalnum() or c in "._- ")
-                            
-                            # Ensure the source file exists and is complete
-                            old_path = download_dir / original_filename
-                            new_path = download_dir / new_filename
-                            
-                            # Wait for file to be ready for renaming
-                            time.sleep(2)
-                            
-                            try:
-                                old_path.rename(new_path)
-                                print(f"Successfully renamed {original_filename} to {new_filename}")
-                                
-                                # Update Excel with successful download
-                                case_data['pdf_status'] = 'DOWNLOADED'
-                                case_data['original_filename'] = original_filename
-                                case_data['new_filename'] = new_filename
-                                update_excel(config, i, case_data)
-                                
-                                # Update config
-                                config["downloaded_pdf_number"] = i
-                                save_config(config)
-                            except Exception as rename_error:
-                                print(f"Error renaming file: {rename_error}")
-                                raise
-                        else:
-                            print(f"Timeout waiting for PDF download for row {i}")
-                            raise Exception("Download timeout")
-                            
-                    except Exception as e:
-                        print(f"Error processing download/rename for PDF {i}: {e}")
-                        continue
-
-                # Check if we've reached the end serial
-                if i >= config["pdf_range"]["end_serial"]:
-                    print(f"\nReached end serial number {config['pdf_range']['end_serial']}")
-                    print("Saving final Excel updates...")
-                    
-                    # Get Excel workbook and save
-                    try:
-                        wb = load_workbook(config["excel_path"])
-                        wb.save(config["excel_path"])
-                        print(f"Excel file saved successfully: {config['excel_path']}")
-                    except Exception as excel_error:
-                        print(f"Error saving final Excel update: {excel_error}")
-                    
-                    print("\nScript completed successfully!")
-                    return  # Exit the function after reaching end serial
-
-            except Exception as e:
-                print(f"Error downloading PDF {i}: {e}")
-                continue
-
-    except Exception as e:
-        print(f"Error in main process: {e}")
-        input("Press Enter to close the browser...")
-    finally:
-        if 'driver' in locals():
-            driver.quit()
-
-if __name__ == "__main__":
-    print("Script starting...")
-    main()
-    print("Script finished.")
-    input("Press Enter to exit...")
+import os
+import sys
+import time
+import json
+import threading
+from datetime import datetime
+import requests
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.chrome.service import Service
+from dotenv import load_dotenv
+from pathlib import Path
+from results_sink import open_results_sink, write_workbook
+from selenium.common.exceptions import TimeoutException
+from waits import (wait_for, clickable, present, page_ready, overlay_gone, image_loaded,
+                   table_rows_stable, any_of, download_started, download_finished,
+                   record_wait, load_wait_stats, save_wait_stats, print_wait_summary)
+from shards import run_sharded
+from pipeline import Stage, close_stages
+from download_watcher import watcher_for, stop_watchers
+from job_state import open_job_state, DOWNLOADED
+from case_index import build_case_index
+from pdf_store import open_pdf_store, InvalidPdf
+from text_index import TextIndexer, INDEX_FILE as TEXT_INDEX_FILE
+from session_cache import (session_cache_path, search_key, load_search, save_search, forget_search,
+                           restore_cookies, CachedRecords, DEFAULT_MAX_AGE as DEFAULT_SESSION_MAX_AGE)
+from driver_manager import apply_light_profile, prepare_driver, driver_manager
+import metrics
+from metrics import timed, observe, count, count_row
+from captcha import (LocalCaptchaSolver, GeminiCaptchaSolver, FixedCaptchaSolver, solve_with, record_attempt,
+                     SAMPLES_DIR as CAPTCHA_SAMPLES_DIR,
+                     load_stats as load_captcha_stats, save_stats as save_captcha_stats,
+                     print_stats as print_captcha_stats)
+from date_windows import walk_windows, window_serials, saved_plan, DEFAULT_MAX_ROWS
+from pdf_fetcher import resolve_pdf_request, session_from_driver, fetch_many, print_fetch_summary, move_without_overwrite
+
+# Load environment variables; Gemini itself is configured on first use
+load_dotenv()
+
+generation_config = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+_gemini_model = None
+
+def gemini_model():
+    """The Gemini model, configured the first time a captcha needs it"""
+    global _gemini_model
+    if _gemini_model is None:
+        import google.generativeai as genai
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("No API key found. Please set the GEMINI_API_KEY environment variable.")
+        genai.configure(api_key=api_key)
+        _gemini_model = genai.GenerativeModel(
+            model_name="gemini-1.5-flash",
+            generation_config=generation_config,
+        )
+    return _gemini_model
+
+# Constants
+CONFIG_FILE = os.getenv("KHC_CONFIG", "new.json")
+WEBSITE_URL = "https://karnatakajudiciary.kar.nic.in/newwebsite/rep_judgment.php"
+BENCH_SELECT_XPATH = "/html/body/div[1]/div[2]/div[1]/div[2]/div[3]/select"
+FROM_DATE_XPATH = "/html/body/div[1]/div[2]/div[1]/form/div[2]/div[2]/div[6]/div[2]/div/input"
+TO_DATE_XPATH = "/html/body/div[1]/div[2]/div[1]/form/div[2]/div[2]/div[6]/div[4]/div/input"
+CAPTCHA_IMG_XPATH = "//img[@id='captcha']"
+CAPTCHA_INPUT_XPATH = "/html/body/div[1]/div[2]/div[1]/form/div[2]/div[2]/div[8]/div[4]/div/input"
+SEARCH_BUTTON_XPATH = "/html/body/div[1]/div[2]/div[1]/form/div[2]/div[2]/div[9]/div[2]/button[1]"
+NOT_FOUND_OK_XPATH = "/html/body/div[9]/div/div[6]/button[1]"
+RESULTS_TBODY_XPATH = "/html/body/div[1]/div[2]/div[1]/div[4]/div/div/div/div[2]/div/div[2]/table/tbody"
+
+# Reads every result row in one round trip. Column positions match the
+# td[3] (case no), td[4] (year), td[6] (parties), td[8] (judge),
+# td[9] (decision date) and td[15] (PDF button) XPaths used before.
+SNAPSHOT_TABLE_JS = """
+var tbody = document.evaluate(arguments[0], document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!tbody) { return null; }
+function cellText(cell, selector) {
+    if (!cell) { return ''; }
+    var el = selector ? cell.querySelector(selector) : cell;
+    return el ? el.innerText.trim() : '';
+}
+var records = [];
+for (var i = 0; i < tbody.rows.length; i++) {
+    var cells = tbody.rows[i].cells;
+    var button = cells[14] ? cells[14].querySelector('button') : null;
+    var attrs = {};
+    var form = null;
+    if (button) {
+        for (var a = 0; a < button.attributes.length; a++) {
+            attrs[button.attributes[a].name] = button.attributes[a].value;
+        }
+        // The PDF request behind the button, if it submits a form
+        var owner = button.form;
+        if (owner) {
+            var fields = {};
+            for (var f = 0; f < owner.elements.length; f++) {
+                var el = owner.elements[f];
+                if (el.name && el.tagName !== 'BUTTON' && ((el.type !== 'checkbox' && el.type !== 'radio') || el.checked)) {
+                    fields[el.name] = el.value;
+                }
+            }
+            if (button.name) { fields[button.name] = button.value; }
+            form = {
+                action: button.getAttribute('formaction') || owner.getAttribute('action') || '',
+                method: (button.getAttribute('formmethod') || owner.method || 'get').toUpperCase(),
+                fields: fields
+            };
+        }
+    }
+    records.push({
+        row_index: i + 1,
+        case_no: cellText(cells[2], 'button u'),
+        year: cellText(cells[3], 'button u'),
+        case_title: cellText(cells[5]),
+        judge_name: cellText(cells[7]),
+        decision_date: cellText(cells[8]),
+        has_pdf: !!button,
+        pdf_onclick: button ? (button.getAttribute('onclick') || '') : '',
+        pdf_attrs: attrs,
+        pdf_form: form
+    });
+}
+return records;
+"""
+
+def website_url(config):
+    """Judgment search page; KHC_WEBSITE_URL or config["website_url"] can point it at a mirror or the mock portal"""
+    return os.getenv("KHC_WEBSITE_URL") or config.get("website_url") or WEBSITE_URL
+
+def load_config():
+    with open(CONFIG_FILE, 'r') as f:
+        return json.load(f)
+
+def save_config(config):
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump(config, f, indent=4)
+
+def setup_driver(config=None):
+    if config is None:
+        config = load_config()
+    
+    # Create download directory if it doesn't exist
+    download_dir = config["download_directory"]
+    if not os.path.exists(download_dir):
+        print(f"Creating download directory: {download_dir}")
+        os.makedirs(download_dir, exist_ok=True)
+    
+    chrome_options = webdriver.ChromeOptions()
+    
+    # Enhanced download preferences
+    chrome_options.add_experimental_option('prefs', {
+        "download.default_directory": config["download_directory"],
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True,
+        "plugins.always_open_pdf_externally": True,
+        # Force PDF to download instead of opening in browser
+        "download.extensions_to_open": "",
+        "browser.download.manager.showWhenStarting": False,
+        "browser.download.manager.focusWhenStarting": False,
+        "browser.download.manager.useWindow": False,
+        "browser.helperApps.neverAsk.saveToDisk": "application/pdf",
+        "pdfjs.disabled": True
+    })
+    
+    # Add more compatibility options
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-software-rasterizer')
+    chrome_options.add_argument('--disable-extensions')
+    browser_config = config.get("browser", {})
+    if not browser_config.get("headless"):
+        chrome_options.add_experimental_option("detach", True)
+        chrome_options.add_argument("--start-maximized")
+    apply_light_profile(chrome_options, browser_config)
+    chrome_options.add_argument('--ignore-certificate-errors')
+    chrome_options.add_argument('--ignore-ssl-errors')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    
+    print("Setting up Chrome driver...")
+    try:
+        # First try with default service
+        service = Service()
+        driver = webdriver.Chrome(options=chrome_options)
+        print("Chrome driver created successfully with default service")
+        prepare_driver(driver, browser_config, download_dir)
+        return driver
+    except Exception as e1:
+        print(f"Failed with default service: {e1}")
+        try:
+            # Try with explicit chromedriver path
+            service = Service(executable_path=os.path.join(os.getcwd(), "chromedriver.exe"))
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+            print("Chrome driver created successfully with explicit path")
+            prepare_driver(driver, browser_config, download_dir)
+            return driver
+        except Exception as e2:
+            print(f"Failed with explicit path: {e2}")
+            print("\nTroubleshooting steps:")
+            print("1. Make sure Chrome is installed")
+            print("2. Download matching chromedriver from: https://googlechromelauncher.github.io/chromedriver/")
+            print("3. Place chromedriver.exe in the same folder as this script")
+            print("4. Your Chrome version: Check in Chrome menu > Help > About Google Chrome")
+            raise
+
+_captcha_solvers = None
+
+def get_captcha_solvers(config):
+    """Captcha solvers in the order they should be tried (config["captcha"]["solvers"])"""
+    global _captcha_solvers
+    if _captcha_solvers is None:
+        captcha_config = config.get("captcha", {})
+        available = {
+            "local": lambda: LocalCaptchaSolver(captcha_config.get("samples_dir", CAPTCHA_SAMPLES_DIR)),
+            "gemini": lambda: GeminiCaptchaSolver(gemini_model()),
+            "fixed": lambda: FixedCaptchaSolver(captcha_config["fixed_answer"]),
+        }
+        names = captcha_config.get("solvers", ["local", "gemini"])
+        _captcha_solvers = []
+        for name in names:
+            try:
+                _captcha_solvers.append(available[name]())
+            except Exception as e:
+                print(f"Captcha solver {name} unavailable: {e}")
+        if not _captcha_solvers:
+            raise Exception(f"None of the captcha solvers {names} could be set up")
+    return _captcha_solvers
+
+def refresh_captcha(driver):
+    """Ask the site for a new captcha image"""
+    img = driver.find_element(By.XPATH, CAPTCHA_IMG_XPATH)
+    driver.execute_script(
+        "arguments[0].src = arguments[0].src.split('?')[0] + '?' + Date.now();", img)
+
+def solve_captcha(driver, solvers):
+    """Read the captcha image and type in the first valid answer; returns (solver, text, image)"""
+    try:
+        # Get captcha image once it has actually loaded
+        captcha_img = wait_for(driver, "captcha_image", image_loaded(CAPTCHA_IMG_XPATH))
+        
+        # Only the captcha element, not the whole page
+        image_png = captcha_img.screenshot_as_png
+        start = time.monotonic()
+        solver, captcha_text = solve_with(solvers, image_png)
+        observe("captcha", time.monotonic() - start, ok=captcha_text is not None)
+        if captcha_text is None:
+            print("Invalid captcha text (not 6 digits)")
+            return None, None, image_png
+            
+        # Enter captcha
+        captcha_input = wait_for(driver, "captcha_input", present(CAPTCHA_INPUT_XPATH))
+        captcha_input.clear()
+        captcha_input.send_keys(captcha_text)
+        return solver, captcha_text, image_png
+        
+    except Exception as e:
+        print(f"Error solving captcha: {e}")
+        return None, None, None
+
+def popup_message(driver):
+    return driver.execute_script(
+        "var c = document.querySelector('.swal2-container'); return c ? c.innerText : '';") or ''
+
+_text_indexer = None
+
+def start_text_indexer(config):
+    """Index downloaded PDFs in the background while crawling (config["text_index"])"""
+    global _text_indexer
+    index_config = config.get("text_index", {})
+    if index_config.get("enabled") and _text_indexer is None:
+        _text_indexer = TextIndexer(index_config.get("path", TEXT_INDEX_FILE), index_config.get("workers"))
+
+def stop_text_indexer():
+    global _text_indexer
+    if _text_indexer is not None:
+        _text_indexer.close()
+        _text_indexer = None
+
+_case_index = None  # delta crawl index of the running crawl, kept current as rows are recorded
+
+def setup_excel(config=None):
+    """Setup Excel file with proper headers"""
+    if config is None:
+        config = load_config()
+    excel_path = config["excel_path"]
+    excel_dir = os.path.dirname(excel_path)
+    
+    if not os.path.exists(excel_dir):
+        os.makedirs(excel_dir, exist_ok=True)
+    
+    if not os.path.exists(excel_path):
+        write_workbook(excel_path, [])
+    return excel_path
+
+def update_excel(sink, row_num, case_data):
+    """Queue a row with case details for the next batch write"""
+    try:
+        with timed("record"):
+            sink.add(row_num, case_data)
+        count_row(case_data)
+        if _case_index is not None:
+            _case_index.add(case_data)
+        if _text_indexer is not None and case_data.get('pdf_path'):
+            _text_indexer.submit(case_data['pdf_path'], case_data)
+        print(f"Recorded case {row_num}")
+    except Exception as e:
+        print(f"Error updating Excel for case {row_num}: {e}")
+
+def save_checkpoint(config, rows, jobs):
+    """Mark rows done and advance downloaded_pdf_number once a batch is safely written"""
+    jobs.mark_rows(rows)
+    downloaded = [row[0] for row in rows if row[6] == 'DOWNLOADED']
+    if downloaded and max(downloaded) > config["downloaded_pdf_number"]:
+        config["downloaded_pdf_number"] = max(downloaded)
+        save_config(config)
+
+def snapshot_result_table(driver):
+    """Read the whole results table into a list of case records in one call"""
+    with timed("extract_rows"):
+        records = driver.execute_script(SNAPSHOT_TABLE_JS, RESULTS_TBODY_XPATH)
+    if records is None:
+        raise Exception("Results table not found")
+    print(f"Read {len(records)} rows from results table")
+    return records
+
+def bench_option_xpath(bench):
+    """Bench dropdown option by its label; option[2] is the Principal Bench"""
+    if bench == "Principal Bench":
+        return BENCH_SELECT_XPATH + "/option[2]"
+    return f"{BENCH_SELECT_XPATH}/option[normalize-space()='{bench}']"
+
+def pdf_button_xpath(row_index):
+    return f"{RESULTS_TBODY_XPATH}/tr[{row_index}]/td[15]/button"
+
+def build_new_filename(case_data):
+    """Build the KAHC_<case no>_<year>_<party1>_VS_<party2>.pdf name"""
+    parties_split = case_data['case_title'].split(" VS ", 1)
+    first_party = parties_split[0].strip() if len(parties_split) > 0 else "PARTY1"
+    second_party = parties_split[1].strip() if len(parties_split) > 1 else "PARTY2"
+    
+    new_filename = f"KAHC_{case_data['case_no']}_{case_data['year']}_{first_party}_VS_{second_party}.pdf"
+    return "".join(c for c in new_filename if c.isalnum() or c in "._- ")
+
+def case_data_from_record(record):
+    return {key: record[key] for key in
+            ('case_no', 'year', 'case_title', 'judge_name', 'decision_date')}
+
+def click_pdf(driver, config, i, record, watcher, since=0):
+    """Click a row's PDF button; returns "popup" for record not found, else "download" """
+    with timed("click"):
+        return click_pdf_button(driver, i, record, watcher, since)
+
+def click_pdf_button(driver, i, record, watcher, since=0):
+    # Before clicking PDF button, remove any blocking elements
+    remove_blocking_elements(driver)
+    
+    # Click PDF button
+    pdf_xpath = pdf_button_xpath(record['row_index'])
+    pdf_button = wait_for(driver, "pdf_button", clickable(pdf_xpath), quiet=True)
+    
+    # Scroll the button into view and ensure it's clickable
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", pdf_button)
+    
+    # Try JavaScript click if regular click fails
+    try:
+        pdf_button.click()
+    except:
+        driver.execute_script("arguments[0].click();", pdf_button)
+    
+    # Either the record not found popup shows up or a download starts
+    try:
+        outcome, _ = wait_for(driver, "pdf_response", any_of(
+            popup=clickable(NOT_FOUND_OK_XPATH),
+            download=download_started(watcher, since),
+        ))
+    except TimeoutException:
+        # Nothing visible yet, the download may still turn up
+        return "download"
+    
+    if outcome == "popup":
+        driver.find_element(By.XPATH, NOT_FOUND_OK_XPATH).click()
+        wait_for(driver, "popup_closed", overlay_gone(), quiet=True)
+        print(f"Record not found for PDF {i}, clicked OK")
+    return outcome
+
+def not_available(case_data):
+    case_data['pdf_status'] = 'NOT AVAILABLE'
+    case_data['original_filename'] = ''
+    case_data['new_filename'] = ''
+    return case_data
+
+def finalize_download(driver, watcher, i):
+    """Wait for the next completed download; returns its path"""
+    print(f"Waiting for PDF {i} to download...")
+    try:
+        with timed("download_wait"):
+            new_file = Path(wait_for(driver, "pdf_download", download_finished(watcher), poll=0.1))
+    except TimeoutException:
+        print(f"Timeout waiting for PDF download for row {i}")
+        raise Exception("Download timeout")
+    print(f"PDF {i} download detected")
+    return new_file
+
+def rename_download(config, case_data, new_file):
+    """Rename a finished download to its KAHC_ name and fill in the Excel fields"""
+    download_dir = Path(config["download_directory"])
+    original_filename = new_file.name
+    
+    # Construct new filename
+    new_filename = build_new_filename(case_data)
+    
+    # Ensure the source file exists and is complete
+    old_path = download_dir / original_filename
+    new_path = download_dir / new_filename
+    
+    store = open_pdf_store(config)
+    if store is not None:
+        return store_download(config, store, case_data, old_path, original_filename)
+    
+    try:
+        with timed("rename"):
+            new_path = move_without_overwrite(old_path, new_path)
+        new_filename = new_path.name
+        count("bytes_downloaded", new_path.stat().st_size, path="browser")
+        print(f"Successfully renamed {original_filename} to {new_filename}")
+    except Exception as rename_error:
+        print(f"Error renaming file: {rename_error}")
+        raise
+    
+    # Update Excel with successful download
+    case_data['pdf_status'] = 'DOWNLOADED'
+    case_data['original_filename'] = original_filename
+    case_data['new_filename'] = new_filename
+    case_data['pdf_path'] = str(new_path)
+    return case_data
+
+def month_start(config):
+    return datetime.strptime(config["date_config"]["from_date"], "%d/%m/%Y")
+
+def store_download(config, store, case_data, path, original_filename):
+    """Verify and checksum a finished download and move it into the PDF store"""
+    with timed("store"):
+        relative, sha256, duplicate = store.put(path, case_data, build_new_filename(case_data), month_start(config))
+    if duplicate:
+        count("duplicates")
+        print(f"{original_filename} has the same content as {relative}, keeping the stored copy")
+    else:
+        print(f"Stored {original_filename} as {relative} (sha256 {sha256[:12]})")
+    case_data['pdf_status'] = 'DOWNLOADED'
+    case_data['original_filename'] = original_filename
+    case_data['new_filename'] = os.path.basename(relative)
+    case_data['pdf_path'] = os.path.join(store.root, relative)
+    return case_data
+
+def download_with_browser(driver, config, i, record):
+    """Click the PDF button for one row and rename the downloaded file"""
+    case_data = case_data_from_record(record)
+    
+    # Only downloads that start after this point belong to this row
+    watcher = watcher_for(config["download_directory"])
+    watcher.reset()
+    
+    if click_pdf(driver, config, i, record, watcher) == "popup":
+        return not_available(case_data)
+    
+    # Wait for the file to be complete, not just present
+    new_file = finalize_download(driver, watcher, i)
+    return rename_download(config, case_data, new_file)
+
+def record_for(records, i, offset=0):
+    """Table record for global serial i, when the table starts at serial offset + 1"""
+    index = i - offset - 1
+    if 0 <= index < len(records):
+        return records[index]
+    return None
+
+def download_over_http(driver, config, sink, records, serials, offset=0):
+    """Fetch PDFs directly with the browser's cookies
+
+    Returns the serials left for the browser, and whether the portal
+    answered any of them as if the session had expired.
+    """
+    http_config = config.get("http_download", {})
+    download_dir = Path(config["download_directory"])
+    
+    jobs = []
+    leftover = []
+    for i in serials:
+        record = record_for(records, i, offset)
+        request = resolve_pdf_request(record, driver.current_url) if record else None
+        if request is None:
+            leftover.append(i)
+            continue
+        case_data = case_data_from_record(record)
+        jobs.append({
+            'serial': i,
+            'request': request,
+            'case_data': case_data,
+            'dest': download_dir / build_new_filename(case_data),
+        })
+    
+    if not jobs:
+        print("No PDF requests could be resolved from the table, using the browser")
+        return leftover, False
+    
+    print(f"Fetching {len(jobs)} PDFs over HTTP...")
+    session = session_from_driver(
+        driver,
+        pool_size=http_config.get("max_workers", 4),
+        verify=http_config.get("verify_ssl", True),
+    )
+    results = fetch_many(
+        session, jobs,
+        max_workers=http_config.get("max_workers", 4),
+        retries=http_config.get("retries", 3),
+        timeout=http_config.get("timeout", 60),
+    )
+    store = open_pdf_store(config)
+    completed = []
+    lost = False
+    for job, result in results:
+        completed.append((job, result))
+        i = job['serial']
+        case_data = job['case_data']
+        observe("http_fetch", result['seconds'], ok=result['ok'])
+        if result['ok']:
+            record_wait("http_fetch", result['seconds'])
+            count("bytes_downloaded", result['bytes'], path="http")
+            print(f"PDF {i}: {result['bytes']} bytes in {result['seconds']:.2f}s")
+            if store is not None:
+                try:
+                    store_download(config, store, case_data, Path(result['path']), result['original_filename'])
+                except (InvalidPdf, OSError) as e:
+                    print(f"PDF {i} failed verification, letting the browser retry it: {e}")
+                    leftover.append(i)
+                    continue
+            else:
+                case_data['pdf_status'] = 'DOWNLOADED'
+                case_data['original_filename'] = result['original_filename']
+                case_data['new_filename'] = os.path.basename(result['path'])
+                case_data['pdf_path'] = result['path']
+            update_excel(sink, i, case_data)
+        else:
+            # Not a PDF or failed after retries, let the browser try it
+            print(f"HTTP fetch failed for PDF {i}: {result['error']}")
+            lost = lost or result['session_lost']
+            leftover.append(i)
+    
+    print_fetch_summary(completed)
+    return sorted(leftover), lost
+
+def remove_blocking_elements(driver):
+    """Remove elements that might block clicking PDF buttons"""
+    try:
+        blocker = driver.find_element(By.CLASS_NAME, "swal2-container")
+        driver.execute_script("arguments[0].remove();", blocker)
+    except:
+        pass
+
+def open_search(driver, config, from_date_value=None, to_date_value=None):
+    """Load the judgment page, fill in the search form and return the result records
+
+    With session_cache enabled, a recent search for the same bench and dates
+    is restored from disk instead (see session_cache.CachedRecords).
+    """
+    from_date_value = from_date_value or config["date_config"]["from_date"]
+    to_date_value = to_date_value or config["date_config"]["to_date"]
+    cache_config = config.get("session_cache", {})
+    if not (cache_config.get("enabled") and config.get("http_download", {}).get("enabled")):
+        with timed("search"):
+            return search_judgments(driver, config, from_date_value, to_date_value)
+    
+    path = session_cache_path(config)
+    key = search_key(config, from_date_value, to_date_value)
+    max_age = cache_config.get("max_age", DEFAULT_SESSION_MAX_AGE)
+    
+    def search():
+        with timed("search"):
+            records = search_judgments(driver, config, from_date_value, to_date_value)
+        if records:
+            save_search(path, key, driver, records, max_age)
+        return records
+    
+    entry = load_search(path, key, max_age)
+    if entry is None:
+        return search()
+    with timed("session_restore"):
+        restore_cookies(driver, entry)
+    count("sessions_restored")
+    print(f"Restored cached search session ({len(entry['records'])} rows), skipping captcha and search")
+    return CachedRecords(entry["records"], search, lambda: forget_search(path, key))
+
+def search_judgments(driver, config, from_date_value=None, to_date_value=None):
+    from_date_value = from_date_value or config["date_config"]["from_date"]
+    to_date_value = to_date_value or config["date_config"]["to_date"]
+    
+    # Open website
+    driver.get(website_url(config))
+    wait_for(driver, "page_ready", page_ready())
+    print("Website loaded")
+
+    # Select bench
+    print("Selecting bench...")
+    bench_select = wait_for(driver, "bench_select", clickable(BENCH_SELECT_XPATH))
+    bench_select.click()
+    
+    bench = config.get("bench") or "Principal Bench"
+    print(f"Selecting {bench}...")
+    bench_option = wait_for(driver, "bench_option", clickable(bench_option_xpath(bench)))
+    bench_option.click()
+
+    # Enter dates
+    print("Entering from date...")
+    from_date = wait_for(driver, "from_date", present(FROM_DATE_XPATH))
+    from_date.clear()
+    from_date.send_keys(from_date_value)
+
+    print("Entering to date...")
+    to_date = wait_for(driver, "to_date", present(TO_DATE_XPATH))
+    to_date.clear()
+    to_date.send_keys(to_date_value)
+
+    solvers = get_captcha_solvers(config)
+    max_attempts = config.get("captcha", {}).get("max_attempts", 5)
+    for attempt in range(1, max_attempts + 1):
+        # Solve captcha
+        print(f"Attempting to solve captcha (attempt {attempt}/{max_attempts})...")
+        solver, captcha_text, image_png = solve_captcha(driver, solvers)
+        if captcha_text is None:
+            refresh_captcha(driver)
+            continue
+
+        # Click search
+        print("Clicking search button...")
+        search_button = wait_for(driver, "search_button", clickable(SEARCH_BUTTON_XPATH))
+        search_button.click()
+        
+        # Wait until the results table has stopped growing, or a popup says why not
+        print(f"Waiting for search results for {from_date_value} - {to_date_value}...")
+        outcome, row_count = wait_for(driver, "search_results", any_of(
+            rows=table_rows_stable(RESULTS_TBODY_XPATH),
+            popup=clickable(NOT_FOUND_OK_XPATH),
+        ))
+        if outcome == "popup":
+            message = popup_message(driver)
+            driver.find_element(By.XPATH, NOT_FOUND_OK_XPATH).click()
+            wait_for(driver, "popup_closed", overlay_gone(), quiet=True)
+            if "captcha" in message.lower():
+                print(f"Captcha {captcha_text} rejected by the site")
+                count("captcha_rejected")
+                record_attempt(solver.name, 0, accepted=False)
+                refresh_captcha(driver)
+                continue
+        
+        # The site took the captcha, keep it as a labeled sample for the local solver
+        record_attempt(solver.name, 0, accepted=True)
+        for local in solvers:
+            if isinstance(local, LocalCaptchaSolver):
+                local.add_sample(image_png, captcha_text)
+        
+        if outcome == "popup":
+            print("Search returned no records")
+            return []
+        print(f"Search returned {row_count} rows")
+        return snapshot_result_table(driver)
+    
+    raise Exception(f"Failed to solve captcha after {max_attempts} attempts")
+
+def download_row(driver, config, sink, jobs, records, i, offset=0):
+    """Download one serial; failures go to the job state's retry queue"""
+    try:
+        print(f"Processing PDF {i}...")
+        
+        # Case details come from the table snapshot
+        record = record_for(records, i, offset)
+        if record is None:
+            raise Exception(f"Row not in results table ({len(records)} rows from serial {offset + 1})")
+        case_data = download_with_browser(driver, config, i, record)
+        update_excel(sink, i, case_data)
+    except Exception as e:
+        print(f"Error downloading PDF {i}: {e}")
+        count("rows", status="failed")
+        jobs.mark_failed(i, e, backoff=config.get("retry", {}).get("backoff", 30))
+
+def retry_failed(driver, config, sink, jobs, records, serials, offset=0):
+    """Retry failed serials with backoff while the search results are still open"""
+    retry_config = config.get("retry", {})
+    max_attempts = retry_config.get("max_attempts", 3)
+    max_delay = retry_config.get("max_delay", 300)
+    
+    while True:
+        # A retry that succeeded sits in the sink buffer until the next flush marks it done
+        pending = sink.pending_serials()
+        queue = [(i, next_attempt) for i, next_attempt in jobs.retry_queue(serials, max_attempts)
+                 if i not in pending]
+        if not queue:
+            return
+        i, next_attempt = queue[0]
+        delay = next_attempt - time.time()
+        if delay > max_delay:
+            print(f"{len(queue)} failed rows are not due for {delay:.0f}s, leaving them for the next run")
+            return
+        if delay > 0:
+            print(f"Retrying PDF {i} in {delay:.0f}s ({len(queue)} rows in retry queue)")
+            time.sleep(delay)
+        download_row(driver, config, sink, jobs, records, i, offset)
+
+def download_rows_pipelined(driver, config, sink, jobs, records, serials, offset=0):
+    """Keep clicking while other threads finish downloads, rename files and record rows
+
+    At most pipeline.max_in_flight downloads are outstanding at once. Files
+    are matched to rows in the order they finish, so values above 1 assume
+    the site serves PDFs in the order they were requested.
+    """
+    pipeline_config = config.get("pipeline", {})
+    max_in_flight = pipeline_config.get("max_in_flight", 1)
+    queue_size = pipeline_config.get("queue_size", 8)
+    backoff = config.get("retry", {}).get("backoff", 30)
+    watcher = watcher_for(config["download_directory"])
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+    in_flight_count = [0]
+    in_flight_lock = threading.Lock()
+    
+    def release():
+        with in_flight_lock:
+            in_flight_count[0] -= 1
+        in_flight.release()
+    
+    def failed(item, error):
+        print(f"Error downloading PDF {item['serial']}: {error}")
+        count("rows", status="failed")
+        jobs.mark_failed(item['serial'], error, backoff=backoff)
+    
+    def finalize(item):
+        try:
+            item['path'] = finalize_download(driver, watcher, item['serial'])
+        finally:
+            release()
+        return item
+    
+    def rename(item):
+        rename_download(config, item['case_data'], item['path'])
+        return item
+    
+    def record(item):
+        update_excel(sink, item['serial'], item['case_data'])
+    
+    record_stage = Stage("record", record, maxsize=queue_size, on_error=failed)
+    rename_stage = Stage("rename", rename, output=record_stage, maxsize=queue_size, on_error=failed)
+    finalize_stage = Stage("finalize", finalize, output=rename_stage, maxsize=queue_size, on_error=failed)
+    
+    try:
+        for i in serials:
+            print(f"Processing PDF {i}...")
+            table_record = record_for(records, i, offset)
+            if table_record is None:
+                count("rows", status="failed")
+                jobs.mark_failed(i, f"Row not in results table ({len(records)} rows from serial {offset + 1})", backoff)
+                continue
+            item = {'serial': i, 'case_data': case_data_from_record(table_record)}
+            
+            # Backpressure: wait for a download slot before the next click
+            in_flight.acquire()
+            with in_flight_lock:
+                if in_flight_count[0] == 0:
+                    watcher.reset()
+                in_flight_count[0] += 1
+                since = watcher.activity()
+            try:
+                outcome = click_pdf(driver, config, i, table_record, watcher, since)
+            except Exception as e:
+                release()
+                failed(item, e)
+                continue
+            
+            if outcome == "popup":
+                release()
+                not_available(item['case_data'])
+                record_stage.put(item)
+            else:
+                finalize_stage.put(item)
+    finally:
+        close_stages([finalize_stage, rename_stage, record_stage])
+
+def download_rows(driver, config, sink, jobs, records, serials, offset=0):
+    """Download the given serials from an open results table; returns the records used"""
+    print("Starting PDF downloads...")
+    serials = list(serials)
+    remaining = serials
+    session_lost = False
+
+    # Fetch what we can over HTTP first; the browser handles the rest
+    if config.get("http_download", {}).get("enabled"):
+        remaining, session_lost = download_over_http(driver, config, sink, records, remaining, offset)
+
+    if isinstance(records, CachedRecords):
+        if session_lost:
+            # Sent back to the search page or refused: the cached session has expired
+            print("Cached search session was rejected, searching again")
+            count("sessions_rejected")
+            records.forget()
+            records = records.refresh()
+            remaining, _ = download_over_http(driver, config, sink, records, remaining, offset)
+        elif remaining:
+            # The browser needs a real results table to click on
+            records = records.refresh()
+
+    if config.get("pipeline", {}).get("enabled"):
+        download_rows_pipelined(driver, config, sink, jobs, records, remaining, offset)
+    else:
+        for i in remaining:
+            download_row(driver, config, sink, jobs, records, i, offset)
+    return records
+
+def download_with_recycling(browser, config, sink, jobs, records, serials, offset, search):
+    """Download serials in batches, restarting the browser in between when it has grown too heavy
+
+    search(driver) re-opens the results table in the fresh browser. Failed
+    rows are retried once all batches are through, not after each one.
+    """
+    serials = list(serials)
+    batch = browser.batch_size(len(serials))
+    for start in range(0, len(serials), batch):
+        if start and browser.needs_recycle():
+            browser.recycle()
+            count("browser_recycles")
+            records = search(browser.driver)
+        driver = browser.driver
+        records = download_rows(driver, config, sink, jobs, records, serials[start:start + batch], offset)
+        browser.rows_done(len(serials[start:start + batch]))
+    
+    pending = sink.pending_serials()
+    retry_queue = jobs.retry_queue(serials, config.get("retry", {}).get("max_attempts", 3))
+    if any(i not in pending for i, _ in retry_queue):
+        if isinstance(records, CachedRecords):
+            records = records.refresh()
+        retry_failed(browser.driver, config, sink, jobs, records, serials, offset)
+
+def skip_collected(index, jobs, records, serials, offset=0, include_not_available=True):
+    """Drop serials whose case is already collected; returns the serials still to download"""
+    todo = []
+    skipped = 0
+    for i in serials:
+        record = record_for(records, i, offset)
+        if record is not None and index.has(record, include_not_available):
+            jobs.mark(i, DOWNLOADED, 'already collected')
+            skipped += 1
+        else:
+            todo.append(i)
+    if skipped:
+        print(f"Skipping {skipped} rows already collected, {len(todo)} new or missing")
+    return todo
+
+def crawl_windows(browser, config, serials, sink, jobs, index=None, on_plan=None, open_ended=False):
+    """Search and download one date window at a time (see date_windows.walk_windows)
+
+    With open_ended, serials past the last requested one are downloaded
+    too, since the total is only known once every window has been searched.
+    """
+    window_config = config.get("date_windows", {})
+    serial_set = set(serials)
+    last_serial = max(serial_set, default=0)
+    
+    def wanted(i):
+        return i in serial_set or (open_ended and i > last_serial)
+    
+    def search(from_date_value, to_date_value):
+        if browser.needs_recycle():
+            browser.recycle()
+            count("browser_recycles")
+        return open_search(browser.driver, config, from_date_value, to_date_value)
+    
+    plan = saved_plan(config)
+    for entry, records in walk_windows(
+            config["date_config"], plan, search,
+            needed=lambda entry: any(wanted(i) for i in window_serials(entry)),
+            max_rows=window_config.get("max_rows", DEFAULT_MAX_ROWS),
+            granularity=window_config.get("granularity", "week")):
+        if on_plan:
+            on_plan(config)
+        todo = [i for i in window_serials(entry) if wanted(i)]
+        print(f"Window {entry['from_date']} - {entry['to_date']}: serials "
+              f"{entry['offset'] + 1}..{entry['offset'] + entry['count']}, {len(todo)} to download")
+        jobs.seed(todo)
+        if index is not None:
+            todo = skip_collected(index, jobs, records, todo, entry["offset"],
+                                  config["delta_crawl"].get("skip_not_available", True))
+        download_with_recycling(
+            browser, config, sink, jobs, records, todo, entry["offset"],
+            lambda driver, entry=entry: open_search(driver, config, entry["from_date"], entry["to_date"]))
+    
+    # The plan now covers the whole date range
+    if plan:
+        config["pdf_range"]["end_serial"] = plan[-1]["offset"] + plan[-1]["count"]
+        if on_plan:
+            on_plan(config)
+
+def discovered_serials(config, jobs, row_count, on_plan=None):
+    """Take the search's row count as end_serial; returns serials beyond the old end"""
+    old_end = config["pdf_range"]["end_serial"]
+    if row_count == old_end:
+        return []
+    print(f"Search returned {row_count} rows, end serial was {old_end}")
+    config["pdf_range"]["end_serial"] = row_count
+    if on_plan:
+        on_plan(config)
+    extra = list(range(max(old_end, config["pdf_range"]["start_serial"] - 1) + 1, row_count + 1))
+    jobs.seed(extra)
+    return extra
+
+def discover_end_serial(config):
+    """Search once just to count the month's judgments (README zero_pdf step)"""
+    browser = driver_manager(config, lambda: setup_driver(config))
+    browser.start()
+    try:
+        records = open_search(browser.driver, config)
+    finally:
+        stop_watchers()
+        browser.quit()
+    print(f"{config['date_config']['from_date']} - {config['date_config']['to_date']}: {len(records)} judgments")
+    return len(records)
+
+def crawl(config, serials, sink, jobs, on_plan=None, open_ended=False):
+    """Search and download the given serials, recording each row in sink"""
+    global _case_index
+    
+    def start():
+        with timed("browser_start"):
+            return setup_driver(config)
+    
+    browser = driver_manager(config, start)
+    browser.start()
+    start_text_indexer(config)
+    try:
+        print("Driver setup complete, proceeding to website...")
+        
+        # Only fetch judgments we don't already have
+        index = None
+        if config.get("delta_crawl", {}).get("enabled"):
+            index = _case_index = build_case_index(config, open_pdf_store(config))
+        
+        if config.get("date_windows", {}).get("enabled"):
+            crawl_windows(browser, config, serials, sink, jobs, index, on_plan, open_ended)
+        else:
+            records = open_search(browser.driver, config)
+            if open_ended:
+                serials = list(serials) + discovered_serials(config, jobs, len(records), on_plan)
+            if index is not None:
+                serials = skip_collected(index, jobs, records, serials, 0,
+                                         config["delta_crawl"].get("skip_not_available", True))
+            download_with_recycling(browser, config, sink, jobs, records, serials, 0,
+                                    lambda driver: open_search(driver, config))
+    finally:
+        _case_index = None
+        stop_watchers()
+        browser.quit()
+        stop_text_indexer()
+
+def crawl_shard(worker_id, config, serials):
+    """Entry point for a worker process started by run_sharded"""
+    load_wait_stats()
+    load_captcha_stats()
+    metrics.start_run(config, name=f"worker{worker_id}")
+    jobs = open_job_state(config)
+    sink = open_results_sink(config, on_flush=jobs.mark_rows)
+    try:
+        crawl(config, serials, sink, jobs)
+    finally:
+        sink.close()
+        jobs.close()
+        save_wait_stats()
+        save_captcha_stats()
+        metrics.finish_run()
+
+def main(interactive=True):
+    """Crawl the month in CONFIG_FILE; returns how many of its rows are still outstanding"""
+    config = load_config()
+    print("Starting automation...")
+    load_wait_stats()
+    load_captcha_stats()
+    metrics.start_run(config)
+    
+    # Setup Excel file first
+    setup_excel(config)  # Add this line to create Excel file at start
+    jobs = open_job_state(config)
+    sink = open_results_sink(config, on_flush=lambda rows: save_checkpoint(config, rows, jobs))
+    
+    # Create necessary directories
+    download_dir = config["download_directory"]
+    excel_dir = os.path.dirname(config["excel_path"])
+    
+    # Create directories if they don't exist
+    for dir_path in [download_dir, excel_dir]:
+        if not os.path.exists(dir_path):
+            print(f"Creating directory: {dir_path}")
+            os.makedirs(dir_path, exist_ok=True)
+    
+    # Unknown month length: sharded runs need it up front, a single crawl finds it while searching
+    if config["pdf_range"]["end_serial"] == 0 and config.get("workers", 1) > 1:
+        config["pdf_range"]["end_serial"] = discover_end_serial(config)
+        save_config(config)
+    
+    # Resume from the job state: only rows not yet downloaded or known unavailable
+    all_serials = range(config["pdf_range"]["start_serial"], config["pdf_range"]["end_serial"] + 1)
+    jobs.seed(all_serials, sink.recorded_rows())
+    serials = jobs.outstanding(all_serials)
+    if config.get("delta_crawl", {}).get("enabled"):
+        # Serials shift when judgments are added; let the case index decide what we have
+        serials = list(all_serials)
+    print(f"{len(serials)} of {len(all_serials)} rows outstanding: {jobs.counts()}")
+    
+    try:
+        workers = config.get("workers", 1)
+        if workers > 1:
+            run_sharded(config, serials, workers, crawl_shard, sink, jobs)
+        else:
+            crawl(config, serials, sink, jobs, on_plan=save_config, open_ended=True)
+
+        print(f"\nReached end serial number {config['pdf_range']['end_serial']}")
+        print("Saving final Excel updates...")
+        
+        # Flush the last batch and write the final workbook once
+        try:
+            sink.close()
+            print(f"Excel file saved successfully: {config['excel_path']}")
+        except Exception as excel_error:
+            print(f"Error saving final Excel update: {excel_error}")
+        
+        print("\nScript completed successfully!")
+
+    except Exception as e:
+        print(f"Error in main process: {e}")
+        if not interactive:
+            raise
+        input("Press Enter to close the browser...")
+    finally:
+        # Keep whatever was collected so far, even on errors
+        try:
+            sink.close()
+        except Exception as e:
+            print(f"Error saving results: {e}")
+        save_wait_stats()
+        print_wait_summary()
+        save_captcha_stats()
+        print_captcha_stats()
+        summary_path = metrics.finish_run()
+        metrics.print_summary()
+        if summary_path:
+            print(f"Run metrics saved to {summary_path}")
+        failures = jobs.failures()
+        if failures:
+            print(f"\nRows still failing ({jobs.counts().get('failed', 0)}):")
+            for serial, attempts, error in failures:
+                print(f"  {serial}: {attempts} attempts, last error: {error}")
+        all_serials = range(config["pdf_range"]["start_serial"], config["pdf_range"]["end_serial"] + 1)
+        remaining = len(jobs.outstanding(all_serials))
+        jobs.close()
+    return remaining
+
+if __name__ == "__main__":
+    print("Script starting...")
+    main()
+    print("Script finished.")
+    input("Press Enter to exit...")
@@ -0,0 +1,192 @@
+import os
+import re
+import time
+import threading
+from pathlib import Path
+from urllib.parse import urljoin, urlparse, unquote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CHUNK_SIZE = 64 * 1024
+
+# Button attributes that may carry the PDF link directly
+URL_ATTRS = ('formaction', 'data-href', 'data-url', 'data-pdf', 'data-file', 'href')
+# window.open('...pdf') / location.href = 'viewpdf.php?id=..' style handlers
+URL_IN_ONCLICK = re.compile(r"""['"]([^'"\s]+?\.(?:pdf|php)(?:\?[^'"\s]*)?)['"]""", re.IGNORECASE)
+FILENAME_IN_HEADER = re.compile(r"""filename\*?=(?:UTF-8'')?["']?([^"';]+)""", re.IGNORECASE)
+# The search form (with its captcha) served where a PDF should be: the session is gone
+SEARCH_PAGE_MARKER = re.compile(rb"""id=["']captcha""", re.IGNORECASE)
+
+_move_lock = threading.Lock()
+
+
+def resolve_pdf_request(record, page_url):
+    """Work out the HTTP request behind a row's PDF button, or None if we can't tell"""
+    if not record.get('has_pdf'):
+        return None
+    attrs = record.get('pdf_attrs') or {}
+
+    for name in URL_ATTRS:
+        if attrs.get(name):
+            return {'method': 'GET', 'url': urljoin(page_url, attrs[name]), 'data': None}
+
+    match = URL_IN_ONCLICK.search(record.get('pdf_onclick') or '')
+    if match:
+        return {'method': 'GET', 'url': urljoin(page_url, match.group(1)), 'data': None}
+
+    # A submit button posts its form; type="button" ones are handled by JavaScript
+    form = record.get('pdf_form')
+    if form and attrs.get('type', 'submit').lower() == 'submit':
+        return {
+            'method': form['method'],
+            'url': urljoin(page_url, form['action'] or page_url),
+            'data': form['fields'],
+        }
+    return None
+
+
+def session_from_driver(driver, pool_size=4, verify=True):
+    """Create a pooled requests.Session carrying the browser's cookies"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.verify = verify
+    if not verify:
+        # Same as the browser's --ignore-certificate-errors
+        requests.packages.urllib3.disable_warnings()
+
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'],
+                            domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent;")
+    session.headers['Referer'] = driver.current_url
+    return session
+
+
+def filename_from_response(response):
+    match = FILENAME_IN_HEADER.search(response.headers.get('Content-Disposition', ''))
+    if match:
+        return unquote(match.group(1).strip())
+    return os.path.basename(urlparse(response.url).path) or ''
+
+
+def session_lost(request, response, body):
+    """Whether a non-PDF response means the portal no longer accepts our session
+
+    True for 401/403, a redirect away from the PDF URL, or the search page
+    itself; a "record not found" page is an answer about the row, not the session.
+    """
+    if response.status_code in (401, 403):
+        return True
+    if response.history and urlparse(response.url).path != urlparse(request['url']).path:
+        return True
+    return bool(SEARCH_PAGE_MARKER.search(body))
+
+
+def unique_path(path):
+    """path, or path with _2, _3, ... before the extension if a file is already there
+
+    KAHC_ names only carry case no, year and parties, so two judgments
+    in one case come out with the same name.
+    """
+    path = Path(path)
+    candidate, n = path, 2
+    while candidate.exists():
+        candidate = path.with_name(f"{path.stem}_{n}{path.suffix}")
+        n += 1
+    return candidate
+
+
+def move_without_overwrite(source, dest):
+    """Move source to dest, or to a free variant of it; returns where it went"""
+    with _move_lock:
+        dest = unique_path(dest)
+        os.replace(source, dest)
+    return dest
+
+
+def fetch_pdf(session, request, dest, retries=3, timeout=60):
+    """Stream one PDF to dest (or a free variant of it), retrying network and server errors"""
+    dest = Path(dest)
+    # Per thread, so two rows with the same KAHC_ name don't share a part file
+    part_path = dest.with_name(f"{dest.name}.{threading.get_ident()}.part")
+    start = time.monotonic()
+    result = {'ok': False, 'bytes': 0, 'seconds': 0.0, 'attempts': 0,
+              'error': '', 'original_filename': '', 'path': '', 'session_lost': False}
+
+    for attempt in range(1, retries + 1):
+        result['attempts'] = attempt
+        try:
+            kwargs = {'stream': True, 'timeout': timeout}
+            if request['method'] == 'POST':
+                kwargs['data'] = request['data']
+            else:
+                kwargs['params'] = request['data']
+
+            with session.request(request['method'], request['url'], **kwargs) as response:
+                if response.status_code >= 500:
+                    raise requests.HTTPError(f"HTTP {response.status_code}")
+                if response.status_code >= 400:
+                    # The server won't change its mind on a retry
+                    result['error'] = f"HTTP {response.status_code}"
+                    result['session_lost'] = session_lost(request, response, b'')
+                    break
+
+                chunks = response.iter_content(CHUNK_SIZE)
+                first = next(chunks, b'')
+                if b'%PDF' not in first[:1024]:
+                    result['error'] = f"Response is not a PDF ({response.headers.get('Content-Type', 'unknown type')})"
+                    result['session_lost'] = session_lost(request, response, first)
+                    break
+
+                size = len(first)
+                with open(part_path, 'wb') as f:
+                    f.write(first)
+                    for chunk in chunks:
+                        f.write(chunk)
+                        size += len(chunk)
+                result['path'] = str(move_without_overwrite(part_path, dest))
+                result['ok'] = True
+                result['bytes'] = size
+                result['error'] = ''
+                result['original_filename'] = filename_from_response(response)
+                break
+
+        except Exception as e:
+            result['error'] = str(e)
+            if part_path.exists():
+                part_path.unlink()
+            if attempt < retries:
+                time.sleep(2 ** (attempt - 1))
+
+    result['seconds'] = time.monotonic() - start
+    return result
+
+
+def fetch_many(session, jobs, max_workers=4, retries=3, timeout=60):
+    """Fetch jobs with bounded concurrency, yielding (job, result) as each finishes"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_pdf, session, job['request'], job['dest'], retries, timeout): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def print_fetch_summary(completed):
+    """Print byte and latency totals for a batch of fetch results"""
+    results = [result for _, result in completed]
+    ok = [result for result in results if result['ok']]
+    if not results:
+        return
+    total_bytes = sum(result['bytes'] for result in ok)
+    latencies = sorted(result['seconds'] for result in ok)
+    print(f"HTTP downloads: {len(ok)}/{len(results)} succeeded, {total_bytes / 1024 / 1024:.1f} MB")
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"Latency per file: avg {sum(latencies) / len(latencies):.2f}s, "
+              f"p95 {p95:.2f}s, max {latencies[-1]:.2f}s")
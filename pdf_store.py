@@ -0,0 +1,243 @@
+import os
+import re
+import shutil
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+
+from case_index import case_key
+
+MANIFEST_FILE = "manifest.sqlite"
+DEFAULT_LAYOUT = "{year}/{month}/{case_type}"
+MIN_PDF_SIZE = 1024          # bytes; anything smaller is an error page or a cut-off download
+TRAILER_WINDOW = 2048        # %%EOF must appear this close to the end
+HASH_CHUNK = 1024 * 1024
+DECISION_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%d")
+
+
+class InvalidPdf(Exception):
+    pass
+
+
+def verify_pdf(path, min_size=MIN_PDF_SIZE):
+    """Raise InvalidPdf unless path looks like a complete PDF (header, size, %%EOF trailer)"""
+    size = os.path.getsize(path)
+    if size < min_size:
+        raise InvalidPdf(f"{os.path.basename(path)} is only {size} bytes")
+    with open(path, 'rb') as f:
+        if b'%PDF' not in f.read(1024):
+            raise InvalidPdf(f"{os.path.basename(path)} has no PDF header")
+        f.seek(max(0, size - TRAILER_WINDOW))
+        if b'%%EOF' not in f.read():
+            raise InvalidPdf(f"{os.path.basename(path)} has no %%EOF trailer, download is truncated")
+    return size
+
+
+def sha256_of(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_decision_date(value):
+    for fmt in DECISION_DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def case_type(case_no):
+    """'WP 12345/2024' -> 'WP', 'CRL.P 100' -> 'CRL.P'"""
+    match = re.match(r"\s*([A-Za-z][A-Za-z.()]*)", str(case_no or ''))
+    kind = match.group(1).strip('.').upper() if match else ''
+    return "".join(c for c in kind if c.isalnum() or c in "._-") or "OTHER"
+
+
+def place_file(source, dest):
+    """Rename source to dest, raising FileExistsError rather than replacing dest"""
+    if os.name == 'nt':
+        os.rename(source, dest)   # refuses to overwrite, unlike os.replace
+        return
+    try:
+        os.link(source, dest)     # fails if dest appeared meanwhile
+    except FileExistsError:
+        raise
+    except OSError:
+        # Different drive (rename fails too), or no hard links on this filesystem
+        if os.path.exists(dest):
+            raise FileExistsError(dest)
+        os.rename(source, dest)
+        return
+    os.remove(source)
+
+
+def move_file(source, dest):
+    """Atomic move that never overwrites; across drives copy next to dest first, then place it"""
+    try:
+        place_file(source, dest)
+    except FileExistsError:
+        raise
+    except OSError:
+        temp = dest + '.tmp'
+        shutil.copyfile(source, temp)
+        try:
+            place_file(temp, dest)
+        except OSError:
+            os.remove(temp)
+            raise
+        os.remove(source)
+
+
+class PdfStore:
+    """Judgment PDFs under root in a year/month/case-type layout, with a SHA-256 manifest
+
+    put() verifies a finished download, hashes it and moves it into place
+    atomically. A file whose content is already stored is dropped and the
+    existing copy is returned, whatever name it came in under.
+    """
+
+    def __init__(self, root, layout=DEFAULT_LAYOUT, min_size=MIN_PDF_SIZE):
+        self.root = str(root)
+        self.layout = layout
+        self.min_size = min_size
+        os.makedirs(self.root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.move_lock = threading.Lock()  # name check and move happen together
+        self.conn = sqlite3.connect(os.path.join(self.root, MANIFEST_FILE), timeout=30,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pdfs (
+                sha256 TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cases (
+                case_no TEXT NOT NULL,
+                year TEXT NOT NULL,
+                decision_date TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (case_no, year, decision_date)
+            )
+        """)
+        self.conn.commit()
+
+    def shard(self, case_data, fallback_date=None):
+        """Relative directory for a case, from its decision date and case number"""
+        decided = parse_decision_date(case_data.get('decision_date', '')) or fallback_date
+        year = str(decided.year) if decided else str(case_data.get('year') or 'unknown')
+        month = decided.strftime('%B').lower() if decided else 'unknown'
+        return self.layout.format(year=year, month=month, case_type=case_type(case_data.get('case_no')))
+
+    def lookup(self, sha256):
+        with self.lock:
+            row = self.conn.execute("SELECT path FROM pdfs WHERE sha256 = ?", (sha256,)).fetchone()
+        if row and os.path.exists(os.path.join(self.root, row[0])):
+            return row[0]
+        return None
+
+    def put(self, source, case_data, filename, fallback_date=None):
+        """Verify, hash and move source into the store; returns (relative path, sha256, duplicate)"""
+        try:
+            size = verify_pdf(source, self.min_size)
+        except InvalidPdf:
+            # Don't leave a broken file where the next download will land
+            os.remove(source)
+            raise
+        sha256 = sha256_of(source)
+
+        existing = self.lookup(sha256)
+        if existing:
+            os.remove(source)
+            self.add_case(case_data, sha256)
+            return existing, sha256, True
+
+        with self.move_lock:
+            relative = self.free_name(os.path.join(self.shard(case_data, fallback_date), filename),
+                                      case_data, sha256)
+            dest = os.path.join(self.root, relative)
+            if os.path.exists(dest):
+                # Identical file already in place, just missing from the manifest
+                os.remove(source)
+                duplicate = True
+            else:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                move_file(source, dest)
+                duplicate = False
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pdfs (sha256, path, size, stored_at) VALUES (?, ?, ?, ?)",
+                (sha256, relative, size, datetime.now().isoformat(timespec='seconds')))
+        self.add_case(case_data, sha256)
+        return relative, sha256, duplicate
+
+    def free_name(self, relative, case_data, sha256):
+        """relative, or a variant of it, that is unused or already holds this exact content
+
+        KAHC_ names only carry case no, year and parties, so two judgments
+        in one case share a name; the later one gets its decision date or,
+        failing that, a short hash appended.
+        """
+        base, ext = os.path.splitext(relative)
+        decided = parse_decision_date(case_data.get('decision_date', ''))
+        candidates = [relative]
+        if decided:
+            candidates.append(f"{base}_{decided:%Y%m%d}{ext}")
+        candidates.append(f"{base}_{sha256[:12]}{ext}")
+        for candidate in candidates:
+            path = os.path.join(self.root, candidate)
+            if not os.path.exists(path) or sha256_of(path) == sha256:
+                return candidate
+        raise FileExistsError(f"{relative} and its alternatives already hold other PDFs")
+
+    def add_case(self, case_data, sha256):
+        key = case_key(case_data.get('case_no'), case_data.get('year'), case_data.get('decision_date'))
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cases (case_no, year, decision_date, sha256) VALUES (?, ?, ?, ?)",
+                (*key, sha256))
+
+    def case_keys(self):
+        """(case_no, year, decision_date) of every stored judgment, normalized like case_index"""
+        with self.lock:
+            return self.conn.execute("SELECT case_no, year, decision_date FROM cases").fetchall()
+
+    def entries(self):
+        with self.lock:
+            return self.conn.execute("SELECT sha256, path, size FROM pdfs ORDER BY path").fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def store_root(config):
+    """config["pdf_store"]["root"], by default the folder above the year/month directories"""
+    store_config = config.get("pdf_store", {})
+    download_dir = config.get("main_download_directory", config["download_directory"])
+    return store_config.get("root") or os.path.dirname(os.path.dirname(os.path.abspath(download_dir)))
+
+
+def open_pdf_store(config):
+    """The shared store for config, or None when config["pdf_store"] is not enabled"""
+    store_config = config.get("pdf_store", {})
+    if not store_config.get("enabled"):
+        return None
+    root = store_root(config)
+    with _stores_lock:
+        if root not in _stores:
+            _stores[root] = PdfStore(root, store_config.get("layout", DEFAULT_LAYOUT),
+                                     store_config.get("min_size", MIN_PDF_SIZE))
+        return _stores[root]
@@ -0,0 +1,57 @@
+import queue
+import threading
+
+_STOP = object()
+
+
+class Stage:
+    """A bounded queue drained by worker threads running handler(item)
+
+    Whatever the handler returns is passed to the output stage; put()
+    blocks while the queue is full, which holds back the stage feeding
+    it. Errors go to on_error(item, error) and don't stop the stage.
+    """
+
+    def __init__(self, name, handler, output=None, workers=1, maxsize=8, on_error=None):
+        self.name = name
+        self.handler = handler
+        self.output = output
+        self.on_error = on_error
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.threads = [
+            threading.Thread(target=self.run, name=f"{name}-{n}", daemon=True)
+            for n in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            try:
+                result = self.handler(item)
+                if self.output is not None and result is not None:
+                    self.output.put(result)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(item, e)
+                else:
+                    print(f"Error in {self.name} stage: {e}")
+
+    def close(self):
+        """Finish everything already queued, then stop the workers"""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+
+
+def close_stages(stages):
+    """Shut stages down upstream first, so each one drains into the next before it stops"""
+    for stage in stages:
+        stage.close()
@@ -0,0 +1,315 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+import threading
+
+from metrics import timed
+
+# Excel layout shared by every sink (header, case_data key)
+COLUMNS = [
+    ('SNo', 'sno'),
+    ('Case No', 'case_no'),
+    ('Year', 'year'),
+    ('Case Title', 'case_title'),
+    ('Decision Date', 'decision_date'),
+    ('Judge Name', 'judge_name'),
+    ('PDF Status', 'pdf_status'),
+    ('PDF Filename', 'original_filename'),
+    ('New Name', 'new_filename'),
+]
+HEADERS = [header for header, _ in COLUMNS]
+COLUMN_WIDTHS = {4: 40, 8: 30, 9: 50}  # Case Title, PDF Filename, New Name
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 30  # seconds
+
+
+def case_row(row_num, case_data):
+    """Turn case_data into a row in COLUMNS order"""
+    return [row_num] + [case_data.get(key, '') for _, key in COLUMNS[1:]]
+
+
+def read_workbook_rows(excel_path):
+    """Read existing data rows (without header) from an Excel file"""
+    from openpyxl import load_workbook
+
+    if not os.path.exists(excel_path):
+        return []
+    wb = load_workbook(excel_path, read_only=True)
+    try:
+        ws = wb.active
+        return [list(row) for row in ws.iter_rows(min_row=2, values_only=True)
+                if any(value not in (None, '') for value in row)]
+    finally:
+        wb.close()
+
+
+def write_workbook(excel_path, rows):
+    """Write headers and rows to excel_path in one streaming (write-only) pass"""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for col in range(1, len(HEADERS) + 1):
+        ws.column_dimensions[get_column_letter(col)].width = COLUMN_WIDTHS.get(col, 15)
+    ws.append(HEADERS)
+    for row in rows:
+        ws.append(row)
+
+    # Save next to the target and swap in, so a crash never leaves a half-written xlsx
+    tmp_path = excel_path + '.tmp'
+    wb.save(tmp_path)
+    os.replace(tmp_path, excel_path)
+
+
+def read_journal_rows(journal_path):
+    """Rows appended to a sink journal that are not in the final file yet"""
+    if not os.path.exists(journal_path):
+        return []
+    rows = []
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # A torn last line from a crash mid-write
+                print(f"Skipping unreadable journal line in {journal_path}")
+    return rows
+
+
+def row_key(row):
+    """(SNo, case no, year, decision date) of a result row
+
+    SNo alone is not enough: serials shift between runs when judgments
+    are added, so one SNo can name different cases.
+    """
+    sno = int(row[0]) if str(row[0]).isdigit() else str(row[0] or '')
+    return (sno,) + tuple(str(value or '').strip() for value in (row[1], row[2], row[4]))
+
+
+def merge_rows(existing, rows):
+    """existing then rows, a later row replacing an earlier one for the same row_key
+
+    Keeps write_final idempotent: a journal replayed after a crash between
+    writing the final file and removing the journal adds nothing twice.
+    """
+    merged = {}
+    for row in list(existing) + list(rows):
+        merged[row_key(row)] = row
+    return list(merged.values())
+
+
+class ResultsSink:
+    """Keeps result rows in memory and flushes them in batches"""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL, on_flush=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.closed = False
+        self.lock = threading.RLock()
+
+    def add(self, row_num, case_data):
+        with self.lock:
+            self.buffer.append(case_row(row_num, case_data))
+            if (len(self.buffer) >= self.batch_size
+                    or time.monotonic() - self.last_flush >= self.flush_interval):
+                self.flush()
+
+    def pending_serials(self):
+        """Serials recorded but not flushed yet, so not marked done in the job state"""
+        with self.lock:
+            return {row[0] for row in self.buffer}
+
+    def flush(self):
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+            if not rows:
+                return
+            with timed("sink_write"):
+                self.write_batch(rows)
+            print(f"Flushed {len(rows)} result rows to {self.describe()}")
+            if self.on_flush:
+                self.on_flush(rows)
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.flush()
+            with timed("sink_finalize"):
+                self.finalize()
+            self.closed = True
+
+    def write_batch(self, rows):
+        raise NotImplementedError
+
+    def recorded_rows(self):
+        """Rows already saved by earlier runs"""
+        return []
+
+    def finalize(self):
+        pass
+
+    def describe(self):
+        return self.__class__.__name__
+
+
+class JournalSink(ResultsSink):
+    """Appends batches to a JSON-lines journal and writes the final file once on close"""
+
+    def __init__(self, output_path, **kwargs):
+        super().__init__(**kwargs)
+        self.output_path = output_path
+        self.journal_path = output_path + '.journal'
+        if os.path.exists(self.journal_path):
+            print(f"Recovering unsaved rows from {self.journal_path}")
+
+    def write_batch(self, rows):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def journal_rows(self):
+        return read_journal_rows(self.journal_path)
+
+    def recorded_rows(self):
+        return self.read_final() + self.journal_rows()
+
+    def read_final(self):
+        return []
+
+    def finalize(self):
+        rows = self.journal_rows()
+        if not rows:
+            return
+        self.write_final(rows)
+        os.remove(self.journal_path)
+        print(f"Saved {len(rows)} rows to {self.output_path}")
+
+    def write_final(self, rows):
+        raise NotImplementedError
+
+    def describe(self):
+        return self.journal_path
+
+
+class ExcelSink(JournalSink):
+    def read_final(self):
+        return read_workbook_rows(self.output_path)
+
+    def write_final(self, rows):
+        write_workbook(self.output_path, merge_rows(self.read_final(), rows))
+
+
+class ParquetSink(JournalSink):
+    def read_final(self):
+        import pyarrow.parquet as pq
+
+        if not os.path.exists(self.output_path):
+            return []
+        keys = [key for _, key in COLUMNS]
+        return [[record.get(key) for key in keys] for record in pq.read_table(self.output_path).to_pylist()]
+
+    def write_final(self, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        keys = [key for _, key in COLUMNS]
+        rows = merge_rows(self.read_final(), rows)
+        columns = {key: [str(row[i]) if row[i] is not None else '' for row in rows]
+                   for i, key in enumerate(keys)}
+        columns['sno'] = [int(row[0]) for row in rows]
+        tmp_path = self.output_path + '.tmp'
+        pq.write_table(pa.table(columns), tmp_path)
+        os.replace(tmp_path, self.output_path)
+
+
+class CsvSink(ResultsSink):
+    def __init__(self, output_path, **kwargs):
+        super().__init__(**kwargs)
+        self.output_path = output_path
+
+    def write_batch(self, rows):
+        new_file = not os.path.exists(self.output_path)
+        with open(self.output_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(HEADERS)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def recorded_rows(self):
+        if not os.path.exists(self.output_path):
+            return []
+        with open(self.output_path, 'r', newline='', encoding='utf-8') as f:
+            return list(csv.reader(f))[1:]
+
+    def describe(self):
+        return self.output_path
+
+
+class SqliteSink(ResultsSink):
+    def __init__(self, output_path, **kwargs):
+        super().__init__(**kwargs)
+        self.output_path = output_path
+        self.conn = sqlite3.connect(output_path, check_same_thread=False)
+        columns = ', '.join(f"{key} TEXT" for _, key in COLUMNS[1:])
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS results (sno INTEGER, {columns})")
+        self.conn.commit()
+
+    def write_batch(self, rows):
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        with self.conn:
+            self.conn.executemany(f"INSERT INTO results VALUES ({placeholders})", rows)
+
+    def recorded_rows(self):
+        return [list(row) for row in self.conn.execute("SELECT * FROM results")]
+
+    def finalize(self):
+        self.conn.close()
+
+    def describe(self):
+        return self.output_path
+
+
+SINK_TYPES = {
+    'excel': (ExcelSink, None),
+    'csv': (CsvSink, '.csv'),
+    'sqlite': (SqliteSink, '.sqlite'),
+    'parquet': (ParquetSink, '.parquet'),
+}
+
+
+def open_results_sink(config, on_flush=None):
+    """Create the results sink described by config["results_sink"]"""
+    sink_config = config.get("results_sink", {})
+    sink_type = sink_config.get("type", "excel")
+    if sink_type not in SINK_TYPES:
+        raise ValueError(f"Unknown results sink type: {sink_type}")
+
+    sink_class, extension = SINK_TYPES[sink_type]
+    output_path = sink_config.get("path")
+    if not output_path:
+        output_path = config["excel_path"]
+        if extension:
+            output_path = os.path.splitext(output_path)[0] + extension
+
+    return sink_class(
+        output_path,
+        batch_size=sink_config.get("batch_size", DEFAULT_BATCH_SIZE),
+        flush_interval=sink_config.get("flush_interval", DEFAULT_FLUSH_INTERVAL),
+        on_flush=on_flush,
+    )
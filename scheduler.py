@@ -0,0 +1,295 @@
+"""Month-by-month crawl queue (the README's zero_pdf workflow)
+
+Keeps a persistent queue of (bench, month) jobs. Each job gets its own
+config file (download directory, Excel file and dates for that month,
+end_serial discovered from the search), is crawled by new.main() in a
+child process, and moves pending -> processing -> done.
+
+    python scheduler.py add 2024-01 2024-12 --bench "Principal Bench"
+    python scheduler.py run --parallel 2
+    python scheduler.py status
+"""
+import os
+import re
+import copy
+import json
+import time
+import sqlite3
+import argparse
+import calendar
+import threading
+import multiprocessing
+from datetime import datetime
+
+QUEUE_FILE = "months.sqlite"
+JOB_CONFIG_DIR = "month_configs"
+DEFAULT_MAX_ATTEMPTS = 3
+DATE_FORMAT = "%d/%m/%Y"
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def month_range(first, last):
+    """'2024-11', '2025-02' -> ['2024-11', '2024-12', '2025-01', '2025-02']"""
+    year, month = map(int, first.split('-'))
+    end = tuple(map(int, last.split('-')))
+    months = []
+    while (year, month) <= end:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+class MonthQueue:
+    """Durable (bench, month) jobs with their status, end_serial and config file"""
+
+    def __init__(self, path=QUEUE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS months (
+                bench TEXT NOT NULL,
+                month TEXT NOT NULL,
+                status TEXT NOT NULL,
+                end_serial INTEGER,
+                outstanding INTEGER,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT NOT NULL DEFAULT '',
+                config_path TEXT NOT NULL DEFAULT '',
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (bench, month)
+            )
+        """)
+        self.conn.commit()
+
+    def add(self, bench, months):
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO months (bench, month, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(bench, month, PENDING, now) for month in months])
+            return self.conn.total_changes - before
+
+    def update(self, bench, month, **fields):
+        fields['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE months SET {assignments} WHERE bench = ? AND month = ?",
+                              (*fields.values(), bench, month))
+
+    def claim(self, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Oldest pending job, marked processing; None when the queue is drained"""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT bench, month FROM months WHERE status = ? AND attempts < ? ORDER BY month, bench LIMIT 1",
+                (PENDING, max_attempts)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE months SET status = ?, attempts = attempts + 1, updated_at = ? WHERE bench = ? AND month = ?",
+                (PROCESSING, datetime.now().isoformat(timespec='seconds'), *row))
+        return row
+
+    def requeue_interrupted(self):
+        """Jobs left processing by a scheduler that died go back to pending"""
+        with self.lock, self.conn:
+            count = self.conn.execute("UPDATE months SET status = ? WHERE status = ?",
+                                      (PENDING, PROCESSING)).rowcount
+        if count:
+            print(f"Requeued {count} months interrupted by the last run")
+
+    def jobs(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT bench, month, status, end_serial, outstanding, attempts, last_error "
+                "FROM months ORDER BY month, bench").fetchall()
+
+    def counts(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM months GROUP BY status").fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+def month_config(base, bench, month, scheduler_config):
+    """Copy of the base config pointed at one month: dates, directories, Excel file, fresh counters"""
+    year, month_no = map(int, month.split('-'))
+    first = datetime(year, month_no, 1)
+    last = datetime(year, month_no, calendar.monthrange(year, month_no)[1])
+    month_name = first.strftime('%B').lower()
+
+    # Default layout follows the existing one: <root>/<year>/<month name>
+    download_root = scheduler_config.get(
+        "download_root", os.path.dirname(os.path.dirname(base["download_directory"])))
+    excel_dir = scheduler_config.get("excel_dir", os.path.dirname(base["excel_path"]))
+    excel_name = scheduler_config.get("excel_name", "karnataka_{mon}_{year}.xlsx")
+    bench_part = [] if bench == base.get("bench") else [slug(bench)]
+    if bench_part:
+        excel_name = f"{bench_part[0]}_{excel_name}"
+
+    config = copy.deepcopy(base)
+    config.pop("window_plan", None)
+    config.pop("window_plan_search", None)
+    config["bench"] = bench
+    config["download_directory"] = os.path.join(download_root, *bench_part, str(year), month_name)
+    config["excel_path"] = os.path.join(
+        excel_dir, excel_name.format(mon=first.strftime('%b').lower(), month=month_name, year=year))
+    config["downloaded_pdf_number"] = 0
+    config["last_updated"] = datetime.now().strftime('%Y-%m-%d')
+    config["date_config"] = {
+        "from_date": first.strftime(DATE_FORMAT),
+        "to_date": last.strftime(DATE_FORMAT),
+        "display_from_date": first.strftime('%d-%m-%Y'),
+        "display_to_date": last.strftime('%d-%m-%Y'),
+        "display_month": month_name,
+    }
+    # 0 = not known yet; the crawl takes it from the search results
+    config["pdf_range"] = {"start_serial": 1, "end_serial": 0}
+    config.setdefault("metrics", {})["prometheus_path"] = f"metrics.{slug(bench)}_{month}.prom"
+    return config
+
+
+def job_config_path(config_dir, bench, month):
+    return os.path.join(config_dir, f"{slug(bench)}_{month}.json")
+
+
+def run_month(config_path):
+    """Child process: crawl one month from its own config file"""
+    import new
+    new.CONFIG_FILE = config_path
+    remaining = new.main(interactive=False)
+    # Exit code tells the scheduler whether the month is complete
+    raise SystemExit(0 if remaining == 0 else 3)
+
+
+def prepare_job(queue, base, bench, month, scheduler_config):
+    """Config file for a claimed job, created once and reused on later attempts"""
+    config_dir = scheduler_config.get("config_dir", JOB_CONFIG_DIR)
+    path = job_config_path(config_dir, bench, month)
+    if not os.path.exists(path):
+        os.makedirs(config_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(month_config(base, bench, month, scheduler_config), f, indent=4)
+    queue.update(bench, month, config_path=path)
+    return path
+
+
+def finish_job(queue, bench, month, config_path, exitcode, max_attempts):
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    end_serial = config["pdf_range"]["end_serial"]
+
+    outstanding = None
+    try:
+        from job_state import open_job_state
+        jobs = open_job_state(config)
+        outstanding = len(jobs.outstanding(range(1, end_serial + 1)))
+        jobs.close()
+    except Exception as e:
+        print(f"Could not read job state for {bench} {month}: {e}")
+
+    if exitcode == 0:
+        queue.update(bench, month, status=DONE, end_serial=end_serial, outstanding=0, last_error='')
+        print(f"{bench} {month}: done, {end_serial} judgments")
+        return
+    attempts = dict(((b, m), a) for b, m, _, _, _, a, _ in queue.jobs()).get((bench, month), 0)
+    status = FAILED if attempts >= max_attempts else PENDING
+    error = f"exit code {exitcode}, {outstanding if outstanding is not None else '?'} rows outstanding"
+    queue.update(bench, month, status=status, end_serial=end_serial, outstanding=outstanding, last_error=error)
+    print(f"{bench} {month}: {error}, {'giving up' if status == FAILED else 'will retry'}")
+
+
+def run_queue(base, scheduler_config):
+    """Crawl pending months, up to scheduler.parallel at a time, until the queue is drained"""
+    parallel = scheduler_config.get("parallel", 1)
+    max_attempts = scheduler_config.get("max_attempts", DEFAULT_MAX_ATTEMPTS)
+    queue = MonthQueue(scheduler_config.get("queue_path", QUEUE_FILE))
+    queue.requeue_interrupted()
+    running = {}  # (bench, month) -> (process, config_path)
+    try:
+        while True:
+            while len(running) < parallel:
+                job = queue.claim(max_attempts)
+                if job is None:
+                    break
+                bench, month = job
+                path = prepare_job(queue, base, bench, month, scheduler_config)
+                process = multiprocessing.Process(target=run_month, args=(path,), name=f"month-{month}")
+                process.start()
+                running[job] = (process, path)
+                print(f"Started {bench} {month} ({len(running)}/{parallel} running)")
+
+            if not running:
+                break
+            for job, (process, path) in list(running.items()):
+                if not process.is_alive():
+                    process.join()
+                    del running[job]
+                    finish_job(queue, *job, path, process.exitcode, max_attempts)
+            time.sleep(1)
+    finally:
+        for process, _ in running.values():
+            process.join()
+        print(f"Month queue: {queue.counts()}")
+        queue.close()
+
+
+def print_status(scheduler_config):
+    queue = MonthQueue(scheduler_config.get("queue_path", QUEUE_FILE))
+    jobs = queue.jobs()
+    queue.close()
+    if not jobs:
+        print("Month queue is empty")
+        return
+    for bench, month, status, end_serial, outstanding, attempts, error in jobs:
+        detail = f"end_serial={end_serial if end_serial is not None else '?'}"
+        if outstanding:
+            detail += f" outstanding={outstanding}"
+        print(f"  {month} {bench:20} {status:10} {detail} attempts={attempts}"
+              f"{'  ' + error if error else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl judgments month by month from a persistent queue")
+    parser.add_argument("--config", default="new.json", help="base config the month configs are derived from")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="queue months, e.g. add 2024-01 2024-12")
+    add.add_argument("first")
+    add.add_argument("last", nargs="?")
+    add.add_argument("--bench", default=None, help="defaults to the base config's bench")
+    run = commands.add_parser("run", help="crawl queued months")
+    run.add_argument("--parallel", type=int, default=None, help="months crawled at once")
+    commands.add_parser("status", help="show the queue")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        base = json.load(f)
+    scheduler_config = base.get("scheduler", {})
+
+    if args.command == "add":
+        queue = MonthQueue(scheduler_config.get("queue_path", QUEUE_FILE))
+        months = month_range(args.first, args.last or args.first)
+        added = queue.add(args.bench or base.get("bench", "Principal Bench"), months)
+        print(f"Queued {added} of {len(months)} months")
+        queue.close()
+    elif args.command == "run":
+        if args.parallel:
+            scheduler_config["parallel"] = args.parallel
+        run_queue(base, scheduler_config)
+    else:
+        print_status(scheduler_config)
+
+
+if __name__ == "__main__":
+    main()
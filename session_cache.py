@@ -0,0 +1,101 @@
+import os
+import json
+import time
+from urllib.parse import urlparse
+
+DEFAULT_MAX_AGE = 1200   # seconds; the portal's PHP session does not last much longer
+
+
+def session_cache_path(config):
+    """Next to the results file, so shard workers each keep their own"""
+    cache_config = config.get("session_cache", {})
+    if cache_config.get("path"):
+        return cache_config["path"]
+    results_path = config.get("results_sink", {}).get("path") or config["excel_path"]
+    return os.path.splitext(results_path)[0] + ".session.json"
+
+
+def search_key(config, from_date, to_date):
+    return f"{config.get('bench', '')}|{from_date}|{to_date}"
+
+
+def read_cache(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable session cache {path}: {e}")
+        return {}
+
+
+def write_cache(path, entries):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f)
+    os.replace(temp_path, path)
+
+
+def save_search(path, key, driver, records, max_age=DEFAULT_MAX_AGE):
+    """Remember the cookies and result records of a successful search"""
+    entries = read_cache(path)
+    now = time.time()
+    # Drop expired searches so the file doesn't grow with every window
+    entries = {name: entry for name, entry in entries.items()
+               if now - entry.get("saved_at", 0) < entry.get("max_age", DEFAULT_MAX_AGE)}
+    entries[key] = {
+        "saved_at": now,
+        "max_age": max_age,
+        "url": driver.current_url,
+        "cookies": driver.get_cookies(),
+        "records": records,
+    }
+    write_cache(path, entries)
+
+
+def load_search(path, key, max_age=DEFAULT_MAX_AGE):
+    """The cached search for key if it is younger than max_age, else None"""
+    entry = read_cache(path).get(key)
+    if not entry:
+        return None
+    age = time.time() - entry.get("saved_at", 0)
+    if age > max_age:
+        print(f"Cached search session is {age:.0f}s old (limit {max_age}s), searching again")
+        return None
+    return entry
+
+
+def forget_search(path, key):
+    entries = read_cache(path)
+    if entries.pop(key, None) is not None:
+        write_cache(path, entries)
+
+
+def restore_cookies(driver, entry):
+    """Put the cached cookies into the browser, on the page they were taken from"""
+    driver.get(entry["url"])
+    driver.delete_all_cookies()
+    host = urlparse(entry["url"]).hostname
+    for cookie in entry["cookies"]:
+        cookie = {name: value for name, value in cookie.items()
+                  if name in ("name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite")}
+        if cookie.get("domain") and host and not host.endswith(cookie["domain"].lstrip('.')):
+            continue
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            print(f"Could not restore cookie {cookie.get('name')}: {e}")
+
+
+class CachedRecords(list):
+    """Result records restored from the session cache
+
+    The browser holds the cookies but no results table, so PDF buttons
+    can't be clicked; refresh() runs the real search and returns its records.
+    """
+
+    def __init__(self, records, refresh, forget):
+        super().__init__(records)
+        self.refresh = refresh
+        self.forget = forget
@@ -0,0 +1,172 @@
+import os
+import csv
+import copy
+import multiprocessing
+
+from results_sink import COLUMNS
+from pdf_fetcher import move_without_overwrite
+
+DEFAULT_MAX_ROUNDS = 3
+
+
+def worker_paths(config, worker_id):
+    """Download directory and results file owned by one worker"""
+    download_dir = os.path.join(config["download_directory"], f".worker{worker_id}")
+    results_path = os.path.splitext(config["excel_path"])[0] + f".worker{worker_id}.csv"
+    return download_dir, results_path
+
+
+def worker_config(config, worker_id):
+    """Copy of config pointing the worker at its own directory and checkpoint file"""
+    download_dir, results_path = worker_paths(config, worker_id)
+    worker = copy.deepcopy(config)
+    worker["download_directory"] = download_dir
+    worker["main_download_directory"] = config["download_directory"]
+    # One row per flush so the checkpoint is exact if the worker dies
+    worker["results_sink"] = {"type": "csv", "path": results_path, "batch_size": 1}
+    worker["workers"] = 1
+    if not config.get("pdf_store", {}).get("enabled"):
+        # Files stay in the worker directory until the merge moves them; index them there
+        worker["text_index"] = dict(config.get("text_index", {}), enabled=False)
+    return worker
+
+
+def split_serials(serials, workers):
+    """Split serials into contiguous, non-overlapping shards"""
+    size, extra = divmod(len(serials), workers)
+    shards = []
+    start = 0
+    for worker_id in range(workers):
+        end = start + size + (1 if worker_id < extra else 0)
+        shards.append(serials[start:end])
+        start = end
+    return shards
+
+
+def read_worker_rows(results_path):
+    if not os.path.exists(results_path):
+        return []
+    rows = []
+    with open(results_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        for row in reader:
+            if len(row) == len(COLUMNS) and row[0].isdigit():
+                rows.append([int(row[0])] + row[1:])
+    return rows
+
+
+def collect_worker_rows(config, workers):
+    """Rows recorded by any worker so far, keyed by serial (first one wins)"""
+    collected = {}
+    for worker_id in range(workers):
+        _, results_path = worker_paths(config, worker_id)
+        for row in read_worker_rows(results_path):
+            collected.setdefault(row[0], row)
+    return collected
+
+
+def run_workers(config, shards, worker_fn):
+    processes = []
+    for worker_id, shard in enumerate(shards):
+        if not shard:
+            continue
+        worker = worker_config(config, worker_id)
+        os.makedirs(worker["download_directory"], exist_ok=True)
+        print(f"Starting worker {worker_id} for serials {shard[0]}..{shard[-1]} ({len(shard)} rows)")
+        process = multiprocessing.Process(target=worker_fn, args=(worker_id, worker, shard),
+                                          name=f"crawler-{worker_id}")
+        process.start()
+        processes.append((worker_id, process))
+
+    for worker_id, process in processes:
+        process.join()
+        if process.exitcode != 0:
+            print(f"Worker {worker_id} exited with code {process.exitcode}, "
+                  f"its unfinished serials will be reassigned")
+
+
+def merge_worker_results(config, workers, sink):
+    """Move worker PDFs into the download directory and their rows into sink"""
+    collected = collect_worker_rows(config, workers)
+    keys = [key for _, key in COLUMNS]
+    moved = []
+    for serial in sorted(collected):
+        case_data = dict(zip(keys, collected[serial]))
+        new_filename = case_data.get('new_filename')
+        if new_filename:
+            for worker_id in range(workers):
+                worker_dir, _ = worker_paths(config, worker_id)
+                source = os.path.join(worker_dir, new_filename)
+                if os.path.exists(source):
+                    dest = move_without_overwrite(source, os.path.join(config["download_directory"], new_filename))
+                    case_data['new_filename'] = dest.name
+                    moved.append((dest, case_data))
+                    break
+        sink.add(serial, case_data)
+    sink.flush()
+    index_merged_pdfs(config, moved)
+
+    # Rows are safely in the main sink now, drop the per-worker checkpoints
+    for worker_id in range(workers):
+        worker_dir, results_path = worker_paths(config, worker_id)
+        if os.path.exists(results_path):
+            os.remove(results_path)
+        if os.path.isdir(worker_dir) and not os.listdir(worker_dir):
+            os.rmdir(worker_dir)
+    print(f"Merged {len(collected)} rows from {workers} workers")
+
+
+def finished_serials(config, workers, serials, jobs=None):
+    """Serials a worker has recorded, or the shared job state has as done
+
+    Workers mark serials the delta crawl skips in the job state only, they
+    never get a row. Pass jobs only once every serial has been handed out:
+    before that, a delta crawl deliberately re-checks serials done earlier.
+    """
+    done = set(collect_worker_rows(config, workers))
+    if jobs is not None:
+        done |= set(serials) - set(jobs.outstanding(serials))
+    return done
+
+
+def index_merged_pdfs(config, moved):
+    """Add moved worker PDFs to the text index at their final paths (workers skip it, see worker_config)"""
+    index_config = config.get("text_index", {})
+    if not moved or not index_config.get("enabled") or config.get("pdf_store", {}).get("enabled"):
+        return
+    from text_index import TextIndexer, INDEX_FILE
+
+    indexer = TextIndexer(index_config.get("path", INDEX_FILE), index_config.get("workers"))
+    try:
+        for path, case_data in moved:
+            indexer.submit(path, case_data)
+    finally:
+        indexer.close()
+
+
+def run_sharded(config, serials, workers, worker_fn, sink, jobs=None):
+    """Crawl serials with one browser per worker process and merge the results
+
+    A serial is only handed out again after the worker that owned it has
+    exited without recording it, so no serial is worked on twice and a
+    dead worker's share is picked up in the next round.
+    """
+    serials = list(serials)
+    max_rounds = config.get("shard_max_rounds", DEFAULT_MAX_ROUNDS)
+
+    for round_no in range(1, max_rounds + 1):
+        done = finished_serials(config, workers, serials, jobs if round_no > 1 else None)
+        remaining = [serial for serial in serials if serial not in done]
+        if not remaining:
+            break
+        print(f"Shard round {round_no}: {len(remaining)} serials across {workers} workers")
+        run_workers(config, split_serials(remaining, workers), worker_fn)
+
+    done = finished_serials(config, workers, serials, jobs)
+    missing = [serial for serial in serials if serial not in done]
+    if missing:
+        print(f"{len(missing)} serials still unfinished after {max_rounds} rounds: "
+              f"{missing[:20]}{'...' if len(missing) > 20 else ''}")
+
+    merge_worker_results(config, workers, sink)
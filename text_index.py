@@ -0,0 +1,234 @@
+"""Full-text index of downloaded judgments (SQLite FTS5)
+
+PDF text is extracted in a process pool and written by a single thread,
+either while the crawl runs (TextIndexer.submit for each stored PDF) or
+in bulk over existing directories:
+
+    python text_index.py rebuild W:\\KhcNew\\karnataka_high_court
+    python text_index.py search "specific performance" --limit 20
+"""
+import os
+import queue
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from case_index import parse_kahc_filename
+
+INDEX_FILE = "judgments_index.sqlite"
+PENDING_PER_WORKER = 4   # extractions queued per process before submit() blocks
+
+_STOP = object()
+
+
+def extract_pdf(path):
+    """Text and page count of one PDF; runs in a worker process"""
+    result = {"path": path, "text": "", "pages": 0, "error": ""}
+    try:
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            PdfReader = None
+        if PdfReader is not None:
+            reader = PdfReader(path)
+            result["pages"] = len(reader.pages)
+            result["text"] = "\n".join(page.extract_text() or "" for page in reader.pages)
+        else:
+            import fitz  # PyMuPDF
+            with fitz.open(path) as document:
+                result["pages"] = document.page_count
+                result["text"] = "\n".join(page.get_text() for page in document)
+    except ImportError:
+        result["error"] = "no PDF text library installed (pip install pypdf)"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def case_data_from_filename(path):
+    """Best-effort case details for files indexed without their Excel row"""
+    parsed = parse_kahc_filename(os.path.basename(path))
+    case_no, year = parsed if parsed else ('', '')
+    return {"case_no": case_no, "year": year}
+
+
+class TextIndex:
+    """documents holds one row per PDF (so unchanged files are skipped), judgments is the FTS5 table"""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                pages INTEGER NOT NULL,
+                case_no TEXT NOT NULL DEFAULT '',
+                year TEXT NOT NULL DEFAULT '',
+                judge_name TEXT NOT NULL DEFAULT '',
+                decision_date TEXT NOT NULL DEFAULT '',
+                error TEXT NOT NULL DEFAULT '',
+                indexed_at TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS judgments USING fts5(
+                case_no, year, judge_name, case_title, body,
+                path UNINDEXED, tokenize = 'porter unicode61'
+            )
+        """)
+        self.conn.commit()
+
+    def is_current(self, path):
+        stat = os.stat(path)
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime FROM documents WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    def add(self, result, case_data):
+        path = result["path"]
+        stat = os.stat(path)
+        values = {key: str(case_data.get(key) or '')
+                  for key in ('case_no', 'year', 'judge_name', 'decision_date', 'case_title')}
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM judgments WHERE path = ?", (path,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents (path, size, mtime, pages, case_no, year, judge_name, "
+                "decision_date, error, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime, result["pages"], values['case_no'], values['year'],
+                 values['judge_name'], values['decision_date'], result["error"],
+                 datetime.now().isoformat(timespec='seconds')))
+            if not result["error"]:
+                self.conn.execute(
+                    "INSERT INTO judgments (case_no, year, judge_name, case_title, body, path) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (values['case_no'], values['year'], values['judge_name'], values['case_title'],
+                     result["text"], path))
+
+    def search(self, query, limit=20):
+        """(case_no, year, judge_name, path, snippet) for the best matches"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT case_no, year, judge_name, path, snippet(judgments, 4, '[', ']', '...', 12) "
+                "FROM judgments WHERE judgments MATCH ? ORDER BY rank LIMIT ?", (query, limit)).fetchall()
+
+    def counts(self):
+        with self.lock:
+            total, pages, errors = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pages), 0), COALESCE(SUM(error != ''), 0) FROM documents").fetchone()
+        return {"documents": total, "pages": pages, "errors": errors}
+
+    def close(self):
+        self.conn.close()
+
+
+class TextIndexer:
+    """Extracts PDFs in a process pool and adds them to a TextIndex from one writer thread
+
+    submit() blocks once workers * PENDING_PER_WORKER files are waiting,
+    so a slow extractor holds back the caller instead of piling up work.
+    """
+
+    def __init__(self, index_path=INDEX_FILE, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.index = TextIndex(index_path)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.pending = threading.BoundedSemaphore(self.workers * PENDING_PER_WORKER)
+        self.results = queue.Queue()
+        self.indexed = 0
+        self.failed = 0
+        self.writer = threading.Thread(target=self.write_loop, name="text-index", daemon=True)
+        self.writer.start()
+
+    def submit(self, path, case_data=None):
+        path = os.path.abspath(str(path))
+        self.pending.acquire()
+        try:
+            future = self.pool.submit(extract_pdf, path)
+        except Exception:
+            self.pending.release()
+            raise
+        case_data = dict(case_data) if case_data else case_data_from_filename(path)
+        future.add_done_callback(lambda done: self.results.put((done, case_data)))
+
+    def write_loop(self):
+        while True:
+            item = self.results.get()
+            if item is _STOP:
+                return
+            future, case_data = item
+            try:
+                result = future.result()
+                self.index.add(result, case_data)
+                if result["error"]:
+                    self.failed += 1
+                    print(f"Could not extract text from {result['path']}: {result['error']}")
+                else:
+                    self.indexed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error indexing PDF: {e}")
+            finally:
+                self.pending.release()
+
+    def close(self):
+        """Finish every submitted file, then stop the pool and the writer"""
+        self.pool.shutdown(wait=True)
+        self.results.put(_STOP)
+        self.writer.join()
+        print(f"Text index: {self.indexed} PDFs indexed, {self.failed} failed ({self.index.path})")
+        self.index.close()
+
+
+def pdf_files(directories):
+    for directory in directories:
+        for folder, _, names in os.walk(directory):
+            for name in sorted(names):
+                if name.lower().endswith('.pdf'):
+                    yield os.path.abspath(os.path.join(folder, name))
+
+
+def rebuild(index_path, directories, workers=None, force=False):
+    """Index every PDF under directories with all cores, skipping files already indexed unchanged"""
+    indexer = TextIndexer(index_path, workers)
+    skipped = 0
+    try:
+        for path in pdf_files(directories):
+            if not force and indexer.index.is_current(path):
+                skipped += 1
+                continue
+            indexer.submit(path)
+    finally:
+        indexer.close()
+    print(f"Skipped {skipped} PDFs already in the index")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text index of downloaded judgments")
+    parser.add_argument("--index", default=INDEX_FILE, help="SQLite index file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("rebuild", help="index every PDF under the given directories")
+    build.add_argument("directories", nargs="+")
+    build.add_argument("--workers", type=int, default=None, help="extraction processes (default: all cores)")
+    build.add_argument("--force", action="store_true", help="re-extract files already indexed")
+    find = commands.add_parser("search", help="FTS5 query, e.g. 'bail AND judge_name:KUMAR'")
+    find.add_argument("query")
+    find.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rebuild(args.index, args.directories, args.workers, args.force)
+    else:
+        index = TextIndex(args.index)
+        for case_no, year, judge_name, path, snippet in index.search(args.query, args.limit):
+            print(f"{case_no} / {year}  {judge_name}\n  {path}\n  {snippet}\n")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
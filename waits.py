@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import threading
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+WAIT_STATS_FILE = "wait_stats.json"
+
+# Starting timeouts (seconds) before we have observed anything
+DEFAULT_TIMEOUTS = {
+    "page_ready": 30,
+    "search_results": 120,
+    "pdf_response": 10,
+    "pdf_download": 45,
+}
+FALLBACK_TIMEOUT = 20
+MIN_TIMEOUT = 2
+MIN_TIMEOUT_FRACTION = 0.5  # never learn a timeout below half the starting one
+MAX_TIMEOUT = 300
+TIMEOUT_FACTOR = 3      # timeout = p95 of observed waits * factor
+MIN_SAMPLES = 5
+MAX_SAMPLES = 200       # keep only recent waits per name
+
+_samples = {}
+_timeouts = {}
+_streaks = {}   # timeouts in a row per name, each doubles the next timeout
+_lock = threading.Lock()
+_last_saved = 0.0
+
+
+def load_wait_stats():
+    """Load observed wait durations from previous runs"""
+    global _samples, _timeouts
+    if not os.path.exists(WAIT_STATS_FILE):
+        return
+    try:
+        with open(WAIT_STATS_FILE, 'r') as f:
+            stats = json.load(f)
+        _samples = {name: entry.get("samples", []) for name, entry in stats.items()}
+        _timeouts = {name: entry.get("timeouts", 0) for name, entry in stats.items()}
+    except Exception as e:
+        print(f"Could not read {WAIT_STATS_FILE}: {e}")
+
+
+def save_wait_stats():
+    with _lock:
+        stats = {name: {"samples": samples, "timeouts": _timeouts.get(name, 0)}
+                 for name, samples in _samples.items()}
+    with open(WAIT_STATS_FILE, 'w') as f:
+        json.dump(stats, f, indent=4)
+
+
+def reset_wait_stats():
+    """Forget all observed waits, e.g. between benchmark runs"""
+    with _lock:
+        _samples.clear()
+        _timeouts.clear()
+        _streaks.clear()
+
+
+def wait_samples():
+    """Copy of the recent wait durations, keyed by wait name"""
+    with _lock:
+        return {name: list(samples) for name, samples in _samples.items()}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def adaptive_timeout(name, default=None):
+    """Timeout for a named wait, learned from how long it has taken before"""
+    if default is None:
+        default = DEFAULT_TIMEOUTS.get(name, FALLBACK_TIMEOUT)
+    with _lock:
+        samples = list(_samples.get(name, []))
+        streak = _streaks.get(name, 0)
+    timeout = default
+    if len(samples) >= MIN_SAMPLES:
+        floor = max(MIN_TIMEOUT, default * MIN_TIMEOUT_FRACTION)
+        timeout = max(floor, percentile(samples, 0.95) * TIMEOUT_FACTOR)
+    # A run of fast samples must not lock us out once the portal slows down
+    return min(MAX_TIMEOUT, timeout * 2 ** streak)
+
+
+def record_wait(name, seconds, timed_out=False):
+    global _last_saved
+    with _lock:
+        if timed_out:
+            _timeouts[name] = _timeouts.get(name, 0) + 1
+            _streaks[name] = _streaks.get(name, 0) + 1
+        else:
+            _streaks.pop(name, None)
+        # A timed-out wait took at least this long, so it counts too
+        samples = _samples.setdefault(name, [])
+        samples.append(round(seconds, 3))
+        del samples[:-MAX_SAMPLES]
+    if time.monotonic() - _last_saved > 30:
+        _last_saved = time.monotonic()
+        save_wait_stats()
+
+
+def wait_for(driver, name, condition, timeout=None, poll=0.2, quiet=False):
+    """Wait until condition(driver) is truthy and log how long it actually took"""
+    timeout = timeout or adaptive_timeout(name)
+    start = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll).until(condition)
+    except TimeoutException:
+        record_wait(name, time.monotonic() - start, timed_out=True)
+        if not quiet:
+            print(f"Wait '{name}' timed out after {timeout:.1f}s")
+        raise
+    elapsed = time.monotonic() - start
+    record_wait(name, elapsed)
+    if not quiet:
+        print(f"Wait '{name}' took {elapsed:.2f}s (timeout {timeout:.1f}s)")
+    return result
+
+
+def print_wait_summary():
+    """Print per-wait latency so timeouts can be tuned"""
+    with _lock:
+        names = sorted(set(_samples) | set(_timeouts))
+        rows = [(name, list(_samples.get(name, [])), _timeouts.get(name, 0)) for name in names]
+    print("\nWait times:")
+    for name, samples, timeouts in rows:
+        if samples:
+            print(f"  {name}: n={len(samples)} avg={sum(samples) / len(samples):.2f}s "
+                  f"p95={percentile(samples, 0.95):.2f}s max={max(samples):.2f}s timeouts={timeouts}")
+        else:
+            print(f"  {name}: no completed waits, timeouts={timeouts}")
+
+
+# Conditions, in the style of selenium's expected_conditions
+
+def page_ready():
+    return lambda driver: driver.execute_script("return document.readyState") == "complete"
+
+
+def clickable(xpath):
+    return EC.element_to_be_clickable((By.XPATH, xpath))
+
+
+def present(xpath):
+    return EC.presence_of_element_located((By.XPATH, xpath))
+
+
+def overlay_gone():
+    """No swal2 popup/overlay left on the page"""
+    return EC.invisibility_of_element_located((By.CLASS_NAME, "swal2-container"))
+
+
+def image_loaded(xpath):
+    def condition(driver):
+        element = driver.find_element(By.XPATH, xpath)
+        loaded = driver.execute_script(
+            "return arguments[0].complete && arguments[0].naturalWidth > 0;", element)
+        return element if loaded else False
+    return condition
+
+
+def table_rows_stable(tbody_xpath, stable_for=2.0, min_rows=1):
+    """Row count of the table has stopped changing for stable_for seconds"""
+    state = {"count": -1, "since": 0.0}
+    script = ("return document.evaluate(arguments[0] + '/tr', document, null, "
+              "XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;")
+
+    def condition(driver):
+        count = driver.execute_script(script, tbody_xpath)
+        now = time.monotonic()
+        if count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+        if count >= min_rows and now - state["since"] >= stable_for:
+            return count
+        return False
+    return condition
+
+
+def any_of(**conditions):
+    """First named condition that holds, returned as (name, result)"""
+    def condition(driver):
+        for name, check in conditions.items():
+            try:
+                result = check(driver)
+            except Exception:
+                result = False
+            if result:
+                return name, result
+        return False
+    return condition
+
+
+def download_started(watcher, since=0):
+    """The browser has begun writing a file since watcher.activity() was since"""
+    return lambda driver: watcher.started(since)
+
+
+def download_finished(watcher):
+    """A PDF has been completely written since watcher.reset(); returns its path"""
+    return lambda driver: watcher.finished()